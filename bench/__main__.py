@@ -0,0 +1,180 @@
+"""
+Offline parser/index benchmarks:
+
+    python -m bench                        # fixtures + archive + synthetic + index
+    python -m bench --only synthetic --save bench_results.json
+    python -m bench --baseline bench_results.json --tolerance 1.3   # exit 1 on regression
+
+Reports median time per page, throughput and tracemalloc peak per page.
+"""
+from __future__ import annotations
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Sequence
+
+from scraper import archive, parse, storage
+from scraper.run import build_driver_index, build_driver_index_parallel
+from . import synth
+
+Case = Dict[str, object]
+
+def _measure(name: str, fn: Callable[[str], object], pages: Sequence[str], repeat: int) -> Case:
+    for p in pages[:3]:
+        fn(p)  # warm caches and compiled XPath/regex
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for p in pages:
+            fn(p)
+        runs.append((time.perf_counter() - t0) / len(pages))
+    peaks = []
+    tracemalloc.start()
+    for p in pages[: min(len(pages), 20)]:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn(p)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    per_page = statistics.median(runs)
+    return {
+        "case": name,
+        "pages": len(pages),
+        "ms_per_page": per_page * 1000,
+        "pages_per_sec": 1.0 / per_page if per_page else float("inf"),
+        "peak_kib_per_page": statistics.median(peaks) / 1024,
+        "kib_per_page": sum(len(p) for p in pages) / len(pages) / 1024,
+    }
+
+def _heat_parsers():
+    return [
+        ("auto", lambda h: parse.parse_heat_details_html(h)),
+        ("bs4", lambda h: parse.parse_heat_details_html(h, engine="bs4")),
+    ]
+
+def fixture_cases(repeat: int) -> List[Case]:
+    out = []
+    heat_pages = [open(f, encoding="utf-8").read() for f in sorted(glob.glob(os.path.join(synth.FIXTURES_DIR, "heatdetails_*.html")))]
+    popups = [open(f, encoding="utf-8").read() for f in sorted(glob.glob(os.path.join(synth.FIXTURES_DIR, "laptimes_*.html")))]
+    if heat_pages:
+        for label, fn in _heat_parsers():
+            out.append(_measure(f"fixtures/heatdetails[{label}]", fn, heat_pages, repeat))
+    if popups:
+        out.append(_measure("fixtures/laptimes_popup", parse.parse_laptimes_popup, popups, repeat))
+    return out
+
+def archive_cases(repeat: int, limit: int) -> List[Case]:
+    heats = archive.list_heats()[-limit:]
+    pages = [archive.read(archive.latest(h)) for h in heats]
+    if not pages:
+        return []
+    return [_measure(f"archive/heatdetails[{label}]", fn, pages, repeat) for label, fn in _heat_parsers()]
+
+def synthetic_cases(repeat: int, pages: int) -> List[Case]:
+    out = []
+    for layout, drivers, laps in [("container", 20, 15), ("container", 4, 8), ("missing-labels", 20, 15), ("fallback", 20, 15)]:
+        corpus = synth.corpus(layout, drivers, laps, pages)
+        for label, fn in _heat_parsers():
+            out.append(_measure(f"synthetic/{layout}-{drivers}x{laps}[{label}]", fn, corpus, repeat))
+    out.append(_measure("synthetic/laptimes_popup-15", parse.parse_laptimes_popup, synth.corpus("popup", 1, 15, pages), repeat))
+    return out
+
+def index_cases(repeat: int) -> List[Case]:
+    heat_nos = storage.list_heat_files()
+    if not heat_nos:
+        return []
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        build_driver_index(heat_nos)
+        runs.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    build_driver_index(heat_nos)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    per_heat = statistics.median(runs) / len(heat_nos)
+    out = [{
+        "case": "index/build_driver_index",
+        "pages": len(heat_nos),
+        "ms_per_page": per_heat * 1000,
+        "pages_per_sec": 1.0 / per_heat,
+        "peak_kib_per_page": peak / 1024 / len(heat_nos),
+        "kib_per_page": None,
+    }]
+    # process pool + k-way merge; pool startup included, as in a real --reindex
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        build_driver_index_parallel(heat_nos)
+        runs.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    build_driver_index_parallel(heat_nos)
+    peak = tracemalloc.get_traced_memory()[1]  # parent process only: the merge
+    tracemalloc.stop()
+    per_heat = statistics.median(runs) / len(heat_nos)
+    out.append({
+        "case": "index/build_driver_index_parallel",
+        "pages": len(heat_nos),
+        "ms_per_page": per_heat * 1000,
+        "pages_per_sec": 1.0 / per_heat,
+        "peak_kib_per_page": peak / 1024 / len(heat_nos),
+        "kib_per_page": None,
+    })
+    return out
+
+def _print(results: List[Case]):
+    print(f"{'case':<48} {'pages':>6} {'ms/page':>9} {'pages/s':>9} {'peak KiB':>9}")
+    for r in results:
+        print(f"{r['case']:<48} {r['pages']:>6} {r['ms_per_page']:>9.3f} {r['pages_per_sec']:>9.1f} {r['peak_kib_per_page']:>9.1f}")
+
+def _regressions(results: List[Case], baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        base = {r["case"]: r for r in json.load(f)["results"]}
+    out = []
+    for r in results:
+        b = base.get(r["case"])
+        if b and r["ms_per_page"] > b["ms_per_page"] * tolerance:
+            out.append(f"{r['case']}: {r['ms_per_page']:.3f} ms/page vs baseline {b['ms_per_page']:.3f}")
+    return out
+
+def main():
+    p = argparse.ArgumentParser(description="Offline parser and index benchmarks")
+    p.add_argument("--only", choices=["fixtures", "archive", "synthetic", "index"], action="append",
+                   help="run just these groups (repeatable)")
+    p.add_argument("--repeat", type=int, default=5, help="timed passes per case (median reported)")
+    p.add_argument("--pages", type=int, default=50, help="pages per synthetic case")
+    p.add_argument("--archive-limit", type=int, default=200, help="newest archived heats to include")
+    p.add_argument("--save", help="write results as JSON (use as a later --baseline)")
+    p.add_argument("--baseline", help="compare against saved results; exit 1 on regression")
+    p.add_argument("--tolerance", type=float, default=1.25, help="allowed slowdown factor vs baseline")
+    args = p.parse_args()
+
+    groups = args.only or ["fixtures", "archive", "synthetic", "index"]
+    results: List[Case] = []
+    if "fixtures" in groups:
+        results += fixture_cases(args.repeat)
+    if "archive" in groups:
+        results += archive_cases(args.repeat, args.archive_limit)
+    if "synthetic" in groups:
+        results += synthetic_cases(args.repeat, args.pages)
+    if "index" in groups:
+        results += index_cases(max(1, args.repeat // 2))
+    _print(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+    if args.baseline:
+        bad = _regressions(results, args.baseline, args.tolerance)
+        for line in bad:
+            print(f"REGRESSION {line}")
+        if bad:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Synthetic ClubSpeed pages for the parser benchmarks.
+
+Layouts mirror what scraper.parse handles: the LapTimesContainer HeatDetails page,
+the generic results-table fallback (per-driver LapTimes links), a container page
+with the #lblDate/lblRaceType labels and title heat number missing, and the
+LapTimes popup. Everything is seeded, so the same arguments give the same page.
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+from datetime import datetime
+from typing import Dict, List, Tuple
+from scraper import storage
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+_FIRST = ["Ed", "Ann", "Kevin", "Maria", "Lukas", "Noah", "Cecilia", "Ryan", "Priya", "Tom", "Jo", "Sam"]
+_LAST = ["Acosta", "Hilbig", "West", "Gallo", "Preller", "Kalthoff", "Waugh", "Newton", "Bunzel", "Lewis"]
+
+def _fmt_lap(t: float) -> str:
+    if t >= 60:
+        m = int(t // 60)
+        return f"{m}:{t - 60 * m:06.3f}"
+    return f"{t:.3f}"
+
+def _fmt_date(dt: datetime) -> str:
+    hour = dt.hour % 12 or 12
+    return f"{dt.month}/{dt.day}/{dt.year} {hour}:{dt.minute:02d} {'PM' if dt.hour >= 12 else 'AM'}"
+
+def _shell(title: str, body: str, rng: random.Random) -> str:
+    # ASP.NET chrome the parser has to wade through: viewstate, scripts, navigation
+    viewstate = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/") for _ in range(6000))
+    nav = "".join(f'<li><a href="/sp_center/page{i}.aspx">Menu item {i}</a></li>' for i in range(40))
+    return f"""<!DOCTYPE html>
+<html><head><title>{title}</title>
+<script type="text/javascript">function __doPostBack(t,a){{var f=document.forms[0];f.__EVENTTARGET.value=t;f.submit();}}</script>
+<link rel="stylesheet" href="/sp_center/style.css"/></head>
+<body><form method="post" action="./HeatDetails.aspx" id="form1">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}"/>
+<div id="header"><ul class="nav">{nav}</ul></div>
+<div id="content">{body}</div>
+<div id="footer"><span>Powered by ClubSpeed</span></div>
+</form></body></html>"""
+
+def random_heat(rng: random.Random, heat_no: int, drivers: int, laps: int) -> Dict:
+    start = datetime(2025, rng.randint(1, 12), rng.randint(1, 28), rng.randint(10, 21), rng.choice([0, 15, 30, 45]))
+    out = []
+    for i in range(drivers):
+        base = rng.uniform(28.0, 75.0)
+        times = [round(base + rng.expovariate(1 / 1.5), 3) for _ in range(laps)]
+        out.append({
+            "name": f"{rng.choice(_FIRST)} {rng.choice(_LAST)} {i}",
+            "laps": times,
+            "lap_positions": [rng.randint(1, drivers) for _ in range(laps)],
+        })
+    return {"heat_no": heat_no, "heat_type": rng.choice(["Arrive and Drive -15 Karts", "20 Karts", "Junior Race"]),
+            "start_time_iso": start.isoformat(), "drivers": out}
+
+def heat_details_container(heat: Dict, rng: random.Random, labels: bool = True) -> str:
+    """LapTimesContainer layout; labels=False drops #lblDate, lblRaceType and the title heat number."""
+    tables = []
+    for d in heat["drivers"]:
+        rows = "".join(
+            f'<tr class="{"LapTimesRow" if i % 2 == 0 else "LapTimesRowAlt"}"><td>{i + 1}</td>'
+            f'<td>{_fmt_lap(t)}&nbsp;[{p}]</td></tr>'
+            for i, (t, p) in enumerate(zip(d["laps"], d["lap_positions"]))
+        )
+        tables.append(f'<td valign="top"><table class="LapTimes"><tr><th colspan="2">{d["name"]}</th></tr>{rows}</table></td>')
+    start = datetime.fromisoformat(heat["start_time_iso"])
+    if labels:
+        title = f"Heat Details - Heat #{heat['heat_no']}"
+        meta = f"""<table class="HeatResults">
+<tr><td class="HeatResultsLeftCell"><span id="lblDate1">Date</span></td><td class="HeatResultsRightCell"><span id="lblDate">{_fmt_date(start)}</span></td></tr>
+<tr><td class="HeatResultsLeftCell">Type</td><td class="HeatResultsRightCell"><span id="ctl00_ContentPlaceHolder1_lblRaceType">{heat['heat_type']}</span></td></tr>
+</table>"""
+    else:
+        title = "Heat Details"
+        meta = f"""<h2>Results for Heat {heat['heat_no']}</h2>
+<table><tr><th>Race Type</th><td>{heat['heat_type']}</td></tr>
+<tr><th>Start Time</th><td>{_fmt_date(start)}</td></tr></table>"""
+    body = f'{meta}<table class="LapTimesContainer"><tr>{"".join(tables)}</tr></table>'
+    return _shell(title, body, rng)
+
+def heat_details_fallback(heat: Dict, rng: random.Random) -> Tuple[str, Dict[str, str]]:
+    """Generic results table with per-driver LapTimes links; also returns {href: popup html}."""
+    rows, popups = [], {}
+    for i, d in enumerate(heat["drivers"]):
+        href = f"/sp_center/LapTimes.aspx?HeatNo={heat['heat_no']}&CustID={1000 + i}"
+        popups[href] = laptimes_popup(d, rng)
+        rows.append(f'<tr><td>{i + 1}</td><td>{d["name"]}</td><td>{rng.randint(1, 30)}</td>'
+                    f'<td>{_fmt_lap(min(d["laps"]))}</td><td><a href="{href}" target="_blank">Lap Times</a></td></tr>')
+    start = datetime.fromisoformat(heat["start_time_iso"])
+    body = f"""<span id="lblDate">{_fmt_date(start)}</span> <span id="lblRaceType">{heat['heat_type']}</span>
+<table class="Results"><tr><th>Pos</th><th>Driver</th><th>Kart</th><th>Best Lap</th><th>Laps</th></tr>{''.join(rows)}</table>"""
+    return _shell(f"Heat Details - Heat #{heat['heat_no']}", body, rng), popups
+
+def laptimes_popup(driver: Dict, rng: random.Random) -> str:
+    rows = "".join(f"<tr><td>{i + 1}</td><td>{_fmt_lap(t)}</td><td>{p}</td></tr>"
+                   for i, (t, p) in enumerate(zip(driver["laps"], driver["lap_positions"])))
+    return f"""<html><head><title>Lap Times</title></head><body>
+<table class="LapTimesPopup"><tr><th>Lap</th><th>Time</th><th>Position</th></tr>{rows}</table></body></html>"""
+
+def corpus(layout: str, drivers: int, laps: int, pages: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for k in range(pages):
+        heat = random_heat(rng, 80000 + k, drivers, laps)
+        if layout == "container":
+            out.append(heat_details_container(heat, rng))
+        elif layout == "missing-labels":
+            out.append(heat_details_container(heat, rng, labels=False))
+        elif layout == "fallback":
+            out.append(heat_details_fallback(heat, rng)[0])
+        elif layout == "popup":
+            out.append(laptimes_popup(heat["drivers"][0], rng))
+        else:
+            raise ValueError(f"unknown layout: {layout}")
+    return out
+
+def write_fixtures(heat_nos: List[int], seed: int = 7):
+    """(Re)generate bench/fixtures/ from real stored heats, so sizes and names look like production."""
+    rng = random.Random(seed)
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for h in heat_nos:
+        # through storage, so compact (laps_ms) files and other backends come back in seconds
+        heat = storage.read_heat(h)
+        if heat is None:
+            raise SystemExit(f"heat {h} is not stored")
+        for d in heat["drivers"]:
+            d["laps"] = d.get("laps") or []
+            d["lap_positions"] = d.get("lap_positions") or [-1] * len(d["laps"])
+        with open(os.path.join(FIXTURES_DIR, f"heatdetails_{h}.html"), "w", encoding="utf-8") as f:
+            f.write(heat_details_container(heat, rng))
+    heat = random_heat(rng, 90001, 12, 14)
+    page, popups = heat_details_fallback(heat, rng)
+    with open(os.path.join(FIXTURES_DIR, "heatdetails_fallback_90001.html"), "w", encoding="utf-8") as f:
+        f.write(page)
+    with open(os.path.join(FIXTURES_DIR, "laptimes_90001.html"), "w", encoding="utf-8") as f:
+        f.write(next(iter(popups.values())))
+
+def main():
+    p = argparse.ArgumentParser(description="Regenerate the checked-in benchmark fixtures")
+    p.add_argument("heats", nargs="+", type=int, help="stored heat numbers to render")
+    args = p.parse_args()
+    write_fixtures(args.heats)
+
+if __name__ == "__main__":
+    main()
@@ -17,11 +17,27 @@ async function loadSummary() {
   }
 }
 
+// Compact heat files store lap times as integer ms (laps_ms / best_lap_ms);
+// bring them back to seconds so older and newer files render the same.
+function expandHeat(doc) {
+  (doc.drivers || []).forEach(d => {
+    if ("laps_ms" in d) {
+      d.laps = Array.isArray(d.laps_ms) ? d.laps_ms.map(t => t == null ? null : t / 1000) : null;
+      delete d.laps_ms;
+    }
+    if ("best_lap_ms" in d) {
+      d.best_lap_seconds = d.best_lap_ms == null ? null : d.best_lap_ms / 1000;
+      delete d.best_lap_ms;
+    }
+  });
+  return doc;
+}
+
 async function loadHeat(heatNo) {
   try {
-    return await jget(`../data/heats/${heatNo}.json`);
+    return expandHeat(await jget(`../data/heats/${heatNo}.json`));
   } catch {
-    return await jget(`./data/heats/${heatNo}.json`);
+    return expandHeat(await jget(`./data/heats/${heatNo}.json`));
   }
 }
 
@@ -0,0 +1,56 @@
+// Per-driver index shards written by the scraper: data/drivers/<slug>.json holds one
+// driver's entries, data/drivers/index.json maps every name to its shard. Pages fetch
+// just the drivers they show; driver_index.json is only used if no shards exist yet.
+
+const DATA_BASES = ["../data", "./data"];   // opened from /frontend, or on GitHub Pages
+
+async function fetchJsonFirst(paths) {
+  for (const p of paths) {
+    try {
+      const r = await fetch(p, { cache: "no-store" });
+      if (r.ok) return r.json();
+    } catch {}
+  }
+  return null;
+}
+
+// Same as scraper.run.driver_slug: readable prefix + first 8 hex of sha1(name)
+async function driverSlug(name) {
+  const base = name.toLowerCase().replace(/[^a-z0-9]+/g, "-").replace(/^-+|-+$/g, "").slice(0, 40) || "driver";
+  const digest = await crypto.subtle.digest("SHA-1", new TextEncoder().encode(name));
+  const hex = Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, "0")).join("");
+  return `${base}-${hex.slice(0, 8)}`;
+}
+
+let directoryPromise = null;
+function loadDriverDirectory() {
+  directoryPromise ??= fetchJsonFirst(DATA_BASES.map(b => `${b}/drivers/index.json`));
+  return directoryPromise;
+}
+
+let fullIndexPromise = null;
+function loadFullDriverIndex() {
+  fullIndexPromise ??= fetchJsonFirst(DATA_BASES.map(b => `${b}/driver_index.json`));
+  return fullIndexPromise;
+}
+
+async function fetchShard(slug) {
+  const shard = await fetchJsonFirst(DATA_BASES.map(b => `${b}/drivers/${slug}.json`));
+  return shard ? (shard.entries || []) : null;
+}
+
+// Entries of one driver (sorted by start time, heat number); [] if unknown
+async function loadDriverEntries(name) {
+  if (window.crypto?.subtle) {
+    const entries = await fetchShard(await driverSlug(name));
+    if (entries) return entries;
+  }
+  const dir = await loadDriverDirectory();
+  if (dir) {
+    const ent = dir.drivers?.[name];
+    return ent ? ((await fetchShard(ent.shard)) || []) : [];
+  }
+  const idx = await loadFullDriverIndex();
+  if (!idx) throw new Error("driver index not found");
+  return idx.drivers?.[name] || [];
+}
@@ -0,0 +1,51 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import List, Optional
+from . import config
+
+def heat_dir(heat_no: int) -> str:
+    return f"{config.ARCHIVE_DIR}/{heat_no}"
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+def list_snapshots(heat_no: int) -> List[str]:
+    """Archived snapshot paths for one heat, oldest first (file names sort by fetch time)."""
+    d = heat_dir(heat_no)
+    if not os.path.isdir(d):
+        return []
+    return [f"{d}/{n}" for n in sorted(os.listdir(d)) if n.endswith(".html.gz")]
+
+def latest(heat_no: int) -> Optional[str]:
+    snaps = list_snapshots(heat_no)
+    return snaps[-1] if snaps else None
+
+def read(path: str) -> str:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return f.read()
+
+def save(heat_no: int, html: str, fetched_at: datetime | None = None) -> str:
+    """
+    Store one fetched page as raw/<heat_no>/<YYYYmmddTHHMMSSZ>.html.gz.
+    A body identical to the newest snapshot is not stored again; that path is returned instead.
+    """
+    prev = latest(heat_no)
+    if prev and content_hash(read(prev)) == content_hash(html):
+        return prev
+    fetched_at = fetched_at or datetime.now(timezone.utc)
+    os.makedirs(heat_dir(heat_no), exist_ok=True)
+    path = f"{heat_dir(heat_no)}/{fetched_at.strftime('%Y%m%dT%H%M%SZ')}.html.gz"
+    tmp = path + ".tmp"
+    # mtime=0 keeps identical pages byte-identical on disk (friendlier to git)
+    with open(tmp, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+        f.write(html.encode("utf-8"))
+    os.replace(tmp, path)
+    return path
+
+def list_heats() -> List[int]:
+    if not os.path.isdir(config.ARCHIVE_DIR):
+        return []
+    return sorted(int(n) for n in os.listdir(config.ARCHIVE_DIR) if n.isdigit())
@@ -1,29 +1,449 @@
 from __future__ import annotations
+import os
+import gzip
+import json
 import time
 import random
+import hashlib
+import threading
 import requests
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from typing import Any, Dict, List, Optional, Tuple
 from . import config
 
+try:
+    import fcntl
+except ImportError:  # Windows: lock-file sharing unavailable, in-process limiting still works
+    fcntl = None
+
 _session = requests.Session()
 _session.headers.update({"User-Agent": config.USER_AGENT})
 
-def get(url: str, timeout: int = None) -> requests.Response:
+class HostUnavailable(Exception):
+    """Raised by get() when a URL ran out of attempts while the circuit breaker is open (the host is down)."""
+
+class RequestFailed(Exception):
+    """Raised by get() when one URL ran out of attempts on network errors but the host otherwise looks healthy."""
+
+class RateLimiter:
+    """
+    Token bucket: `rate` tokens/sec refill up to `burst`; every request takes one.
+
+    Time spent on the wire refills the bucket, so a slow response shortens the
+    wait before the next request instead of adding to it. Thread-safe; with
+    `lock_file` the bucket state lives in that file (guarded by flock) and is
+    shared by every process pointing at it.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, lock_file: Optional[str] = None):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.lock_file = lock_file if fcntl is not None else None
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._stamp = time.time()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        if self.rate <= 0:
+            return
+        while True:
+            wait = self._try_take()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def _try_take(self) -> float:
+        with self._lock:
+            if self.lock_file:
+                return self._try_take_shared()
+            self._tokens, self._stamp, wait = self._take(self._tokens, self._stamp)
+            return wait
+
+    def _take(self, tokens: float, stamp: float) -> Tuple[float, float, float]:
+        now = time.time()
+        tokens = min(float(self.burst), tokens + max(0.0, now - stamp) * self.rate)
+        if tokens >= 1.0:
+            return tokens - 1.0, now, 0.0
+        return tokens, now, (1.0 - tokens) / self.rate
+
+    def _try_take_shared(self) -> float:
+        d = os.path.dirname(self.lock_file)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(self.lock_file, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                parts = f.read().split()
+                try:
+                    tokens, stamp = float(parts[0]), float(parts[1])
+                except (IndexError, ValueError):
+                    tokens, stamp = float(self.burst), time.time()
+                tokens, stamp, wait = self._take(tokens, stamp)
+                f.seek(0)
+                f.truncate()
+                f.write(f"{tokens:.6f} {stamp:.6f}")
+                f.flush()
+                return wait
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+limiter = RateLimiter(config.MAX_REQUESTS_PER_SEC, config.REQUEST_BURST, config.RATE_LIMIT_LOCK_FILE)
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date), capped at RETRY_AFTER_MAX_SEC."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        secs = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        secs = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(secs, 0.0), float(config.RETRY_AFTER_MAX_SEC))
+
+def backoff_seconds(attempt: int) -> float:
+    """Exponential backoff with equal jitter for the given 1-based attempt."""
+    ceiling = min(float(config.RETRY_BACKOFF_MAX_SEC), config.RETRY_BACKOFF_BASE_SEC * (2 ** (attempt - 1)))
+    return ceiling / 2 + random.random() * ceiling / 2
+
+class CircuitBreaker:
+    """
+    Shared across threads. After `threshold` consecutive failures the circuit opens
+    and wait() blocks every caller for the cooldown (or longer, if the host sent
+    Retry-After); then a single probe request goes out. Its success closes the
+    circuit for everyone, its failure re-opens it.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.failures = 0
+        self._open_until = 0.0
+        self._probing = False
+        self._cond = threading.Condition()
+
+    @property
+    def is_open(self) -> bool:
+        return self.failures >= self.threshold
+
+    def wait(self):
+        with self._cond:
+            while True:
+                remaining = self._open_until - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                elif self.is_open and self._probing:
+                    self._cond.wait()
+                else:
+                    if self.is_open:
+                        self._probing = True
+                    return
+
+    def success(self):
+        with self._cond:
+            if self.is_open:
+                print("Circuit closed: host healthy again, resuming.")
+            self.failures = 0
+            self._open_until = 0.0
+            self._probing = False
+            self._cond.notify_all()
+
+    def failure(self, pause: Optional[float] = None):
+        with self._cond:
+            self.failures += 1
+            self._probing = False
+            if self.is_open:
+                cooldown = max(self.cooldown, pause or 0.0)
+                self._open_until = time.monotonic() + cooldown
+                print(f"Circuit open after {self.failures} failure(s): pausing requests for {cooldown:.0f}s.")
+            self._cond.notify_all()
+
+breaker = CircuitBreaker(config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_COOLDOWN_SEC)
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on requests in flight. Each attempt holds a slot from acquire() to
+    release(); release() feeds latency and outcome back. Additive increase after a
+    clean window whose p95 is under target, multiplicative decrease on overload
+    (timeouts, connection errors, 5xx/429). Decisions are printed and kept in `decisions`.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, target_p95: float,
+                 window: int, decrease_factor: float = 0.5):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.target_p95 = target_p95
+        self.window = max(1, window)
+        self.decrease_factor = decrease_factor
+        self.decisions: List[str] = []
+        self._inflight = 0
+        self._samples: List[float] = []
+        self._errors = 0
+        self._since_decrease = self.window
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._inflight >= self.limit:
+                self._cond.wait()
+            self._inflight += 1
+
+    def release(self, latency: float, overloaded: bool):
+        with self._cond:
+            self._inflight -= 1
+            self._since_decrease += 1
+            if overloaded:
+                self._errors += 1
+                if self._since_decrease >= self.window:
+                    self._set_limit(int(self.limit * self.decrease_factor), "timeout/5xx")
+                    self._since_decrease = 0
+            else:
+                self._samples.append(latency)
+            if len(self._samples) + self._errors >= self.window:
+                p95 = self._p95()
+                if not self._errors and p95 is not None and p95 < self.target_p95:
+                    self._set_limit(self.limit + 1, f"p95 {p95:.2f}s < {self.target_p95:.2f}s")
+                self._samples, self._errors = [], 0
+            self._cond.notify_all()
+
+    def _p95(self) -> Optional[float]:
+        if not self._samples:
+            return None
+        xs = sorted(self._samples)
+        return xs[min(len(xs) - 1, int(round(0.95 * (len(xs) - 1))))]
+
+    def _set_limit(self, new: int, why: str):
+        new = min(max(new, self.minimum), self.maximum)
+        if new == self.limit:
+            return
+        msg = f"Concurrency {self.limit} -> {new} ({why})."
+        self.limit = new
+        self.decisions.append(msg)
+        print(msg)
+
+concurrency: Optional[AdaptiveConcurrency] = None
+
+class HttpCache:
+    """
+    On-disk cache of 200 responses, one <sha256(url)>.json (validators + metadata)
+    and gzipped .body.gz pair per URL. Writes are atomic so concurrent workers can
+    share it; prune() keeps the directory under `max_bytes` by dropping the entries
+    fetched longest ago.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 0):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def _base(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, key[:2], key)
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        base = self._base(url)
+        try:
+            with open(base + ".json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with gzip.open(base + ".body.gz", "rb") as f:
+                meta["body"] = f.read()
+        except (OSError, ValueError, EOFError):
+            return None
+        return meta
+
+    def store(self, url: str, resp: requests.Response) -> Dict[str, Any]:
+        body = resp.content or b""
+        meta = {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "content_type": resp.headers.get("Content-Type"),
+            "encoding": resp.encoding,
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "fetched_utc": datetime.now(timezone.utc).isoformat(),
+        }
+        base = self._base(url)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        self._atomic_write(base + ".body.gz", gzip.compress(body, compresslevel=6, mtime=0))
+        self._atomic_write(base + ".json", json.dumps(meta).encode("utf-8"))
+        meta["body"] = body
+        return meta
+
+    def prune(self) -> Tuple[int, int]:
+        """Delete the oldest entries until the cache fits in max_bytes; returns (entries, bytes) removed."""
+        if self.max_bytes <= 0 or not os.path.isdir(self.root):
+            return 0, 0
+        entries = []
+        total = 0
+        for d, _, files in os.walk(self.root):
+            for fn in files:
+                if not fn.endswith(".json"):
+                    continue
+                base = os.path.join(d, fn[:-5])
+                size = 0
+                for path in (base + ".json", base + ".body.gz"):
+                    try:
+                        size += os.path.getsize(path)
+                    except OSError:
+                        pass
+                entries.append((os.path.getmtime(base + ".json"), base, size))
+                total += size
+        removed = freed = 0
+        for _, base, size in sorted(entries):
+            if total - freed <= self.max_bytes:
+                break
+            for path in (base + ".json", base + ".body.gz"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            removed += 1
+            freed += size
+        return removed, freed
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def conditional_headers(meta: Dict[str, Any]) -> Dict[str, str]:
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    @staticmethod
+    def to_response(url: str, meta: Dict[str, Any]) -> requests.Response:
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = url
+        resp._content = meta["body"]
+        resp._content_consumed = True  # lets iter_content() replay the cached body
+        resp.encoding = meta.get("encoding")
+        resp.headers = CaseInsensitiveDict({
+            k: v for k, v in (("ETag", meta.get("etag")),
+                              ("Last-Modified", meta.get("last_modified")),
+                              ("Content-Type", meta.get("content_type"))) if v
+        })
+        return resp
+
+cache = HttpCache(config.HTTP_CACHE_DIR, config.HTTP_CACHE_MAX_MB << 20) if config.HTTP_CACHE_ENABLED else None
+
+def heat_is_immutable(start_time_iso: Optional[str], now: Optional[datetime] = None) -> bool:
+    """Freshness policy: a heat that started HTTP_CACHE_IMMUTABLE_AFTER_DAYS ago won't change."""
+    if not start_time_iso:
+        return False
+    try:
+        start = datetime.fromisoformat(start_time_iso).replace(tzinfo=None)
+    except ValueError:
+        return False
+    now = now or datetime.now()
+    return now - start > timedelta(days=config.HTTP_CACHE_IMMUTABLE_AFTER_DAYS)
+
+def configure_pool(workers: int, adaptive: bool = False, fan_out: int = 1):
+    """
+    Size the shared session's connection pool for `workers` concurrent callers, each
+    of which may have up to `fan_out` requests of its own in flight (LapTimes popups),
+    and, with `adaptive`, let an AIMD controller pick how many of them may be in flight.
+    """
+    global concurrency
+    concurrency = AdaptiveConcurrency(
+        config.AIMD_INITIAL, config.AIMD_MIN, workers, config.AIMD_TARGET_P95_SEC,
+        config.AIMD_WINDOW, config.AIMD_DECREASE_FACTOR,
+    ) if adaptive else None
+    size = max(workers, 1) * max(fan_out, 1)
+    adapter = HTTPAdapter(pool_connections=max(workers, 1), pool_maxsize=size)
+    _session.mount("https://", adapter)
+    _session.mount("http://", adapter)
+
+def _send(url: str, timeout: int, headers: Dict[str, str], stream: bool = False) -> requests.Response:
+    """One attempt: concurrency slot, rate-limit token, request; the outcome is fed back to the controller."""
+    ctrl = concurrency
+    if ctrl:
+        ctrl.acquire()
+    overloaded = True
+    started = time.monotonic()
+    try:
+        limiter.acquire()
+        started = time.monotonic()
+        resp = _session.get(url, timeout=timeout, headers=headers, stream=stream)
+        overloaded = resp.status_code >= 500 or resp.status_code == 429
+        return resp
+    finally:
+        if ctrl:
+            ctrl.release(time.monotonic() - started, overloaded)
+
+def get(url: str, timeout: int = None, immutable: bool = False, stream: bool = False) -> requests.Response:
+    """
+    GET through the rate limiter and HTTP cache. A cached copy is revalidated with a
+    conditional request (304 -> cached body), or returned without touching the
+    network when the caller marks the URL `immutable`.
+
+    Network errors and RETRYABLE_STATUS responses are retried with backoff (honoring
+    Retry-After) behind the shared circuit breaker. When every attempt fails and the
+    breaker is open (failures spanning several URLs), HostUnavailable is raised so
+    callers never mistake an outage for a missing heat. Otherwise the trouble is this
+    URL's alone: the last retryable response is returned, or RequestFailed raised if
+    there never was one.
+
+    With `stream` the body is left unread for the caller to iter_content() (and close);
+    such responses are not written to the cache, since the body may never be read in full.
+    """
     timeout = timeout or config.REQUEST_TIMEOUT_SEC
+    cached = cache.lookup(url) if cache else None
+    if cached and immutable:
+        return HttpCache.to_response(url, cached)
+    headers = HttpCache.conditional_headers(cached) if cached else {}
     last_exc: Optional[Exception] = None
+    last_status: Optional[int] = None
+    last_resp: Optional[requests.Response] = None
     for attempt in range(1, config.REQUEST_RETRY + 1):
+        breaker.wait()
         try:
-            resp = _session.get(url, timeout=timeout)
-            return resp
-        except Exception as exc:
+            resp = _send(url, timeout, headers, stream=stream)
+        except requests.RequestException as exc:
             last_exc = exc
-            # backoff a touch
-            time.sleep(config.REQUEST_SLEEP_BETWEEN_SEC + random.random())
-    if last_exc:
-        raise last_exc
-
-def polite_sleep():
-    time.sleep(config.REQUEST_SLEEP_BETWEEN_SEC + random.random() * 0.7)
+            breaker.failure()
+            delay = backoff_seconds(attempt)
+        else:
+            if resp.status_code not in config.RETRYABLE_STATUS:
+                breaker.success()
+                if resp.status_code == 304 and cached:
+                    return HttpCache.to_response(url, cached)
+                if resp.status_code == 200 and cache and not stream:
+                    cache.store(url, resp)
+                return resp
+            last_status = resp.status_code
+            if last_resp is not None:
+                last_resp.close()
+            last_resp = resp
+            pause = retry_after_seconds(resp.headers.get("Retry-After"))
+            breaker.failure(pause)
+            delay = pause if pause is not None else backoff_seconds(attempt)
+        if attempt < config.REQUEST_RETRY:
+            time.sleep(delay)
+    reason = f"HTTP {last_status}" if last_status is not None else repr(last_exc)
+    msg = f"{url}: gave up after {config.REQUEST_RETRY} attempt(s) ({reason})"
+    if breaker.is_open:
+        raise HostUnavailable(msg) from last_exc
+    if last_resp is not None:
+        return last_resp
+    raise RequestFailed(msg) from last_exc
 
 def heat_details_url(heat_no: int) -> str:
     # e.g., https://.../sp_center/HeatDetails.aspx?HeatNo=82271
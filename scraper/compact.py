@@ -0,0 +1,54 @@
+from __future__ import annotations
+import argparse
+import os
+from typing import List
+from . import config, storage
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Rewrite data/heats/*.json and indexes in the current storage format")
+    p.add_argument("--dry-run", action="store_true", help="report the size change, write nothing")
+    return p.parse_args()
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def _heat_size(heat_no: int) -> int:
+    loc = storage.locate_heat(heat_no)
+    return loc[2] if loc else 0
+
+def main():
+    """
+    One-shot conversion after changing STORAGE_COMPACT: every heat goes through
+    read_heat()/write_heat(), driver_index.json and summary.json through read_json()/write_json().
+    """
+    args = parse_args()
+    if config.STORAGE_BACKEND != "json":
+        raise SystemExit(f"Nothing to do: STORAGE_BACKEND is {config.STORAGE_BACKEND!r}.")
+    before = after = 0
+    heats: List[int] = storage.list_heat_files()
+    for h in heats:
+        before += _heat_size(h)
+        doc = storage.read_heat(h)
+        if args.dry_run:
+            after += len(storage.dumps(storage.compact_heat(doc) if config.STORAGE_COMPACT else doc))
+        else:
+            storage.write_heat(h, doc)
+            after += _heat_size(h)
+    for path in (config.DRIVER_INDEX_FILE, config.SUMMARY_FILE, config.PENDING_FILE, config.FRONTIER_FILE):
+        if not os.path.exists(path):
+            continue
+        before += _size(path)
+        obj = storage.read_json(path)
+        if args.dry_run:
+            after += len(storage.dumps(obj))
+        else:
+            storage.write_json(path, obj)
+            after += _size(path)
+    verb = "would take" if args.dry_run else "now take"
+    print(f"{len(heats)} heat(s) plus indexes: {before / 1e6:.1f} MB {verb} {after / 1e6:.1f} MB.")
+
+if __name__ == "__main__":
+    main()
@@ -14,23 +14,148 @@ START_HEAT_NO = 75533
 
 # Politeness
 REQUEST_TIMEOUT_SEC = 20
-REQUEST_RETRY = 3
-REQUEST_SLEEP_BETWEEN_SEC = 1
+REQUEST_RETRY = 5
+
+# Retry policy:
+# - statuses worth retrying (anything else >= 400 is returned to the caller as-is)
+# - exponential backoff with jitter between attempts; Retry-After wins when sent
+# - circuit breaker: after this many failed requests in a row (across all workers)
+#   every request pauses for the cooldown, then one probe decides whether to resume.
+#   Kept well above REQUEST_RETRY so one bad URL alone can't open it; a URL that runs
+#   out of attempts with the circuit closed is a per-URL miss, not a host outage
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+RETRY_BACKOFF_BASE_SEC = 1.0
+RETRY_BACKOFF_MAX_SEC = 60
+RETRY_AFTER_MAX_SEC = 600
+CIRCUIT_FAILURE_THRESHOLD = 12
+CIRCUIT_COOLDOWN_SEC = 60
+
+# Concurrency:
+# - worker threads used by `--workers N` (1 keeps the classic one-at-a-time walk)
+SCRAPE_WORKERS = 1
+
+# Parser processes fed by the fetch workers (`--parse-workers N`); 0 parses in the
+# fetch threads, which is plenty for incremental runs but GIL-bound on backfills
+PARSE_WORKERS = 0
+
+# Full driver index rebuilds (--reindex, or no usable index yet) load heats in this many
+# processes (0 = one per CPU), in chunks of at least INDEX_CHUNK_HEATS heats
+INDEX_WORKERS = 0
+INDEX_CHUNK_HEATS = 500
+
+# Per-driver LapTimes popups of one heat are fetched in parallel by up to this many
+# threads (duplicate URLs fetched once); the shared rate limiter still applies
+POPUP_FETCH_WORKERS = 8
+
+# `--stream`: HeatDetails bodies are read in chunks of this many bytes and parsed as
+# they arrive; the rest of the page is not downloaded once the lap table has closed
+STREAM_CHUNK_BYTES = 16384
+
+# Adaptive concurrency (`--adaptive`): AIMD on the number of in-flight requests,
+# capped by --workers. Every AIMD_WINDOW responses the limit grows by one if p95
+# latency stayed under target with no errors; a timeout/5xx/429 multiplies it by
+# AIMD_DECREASE_FACTOR (at most once per window).
+AIMD_INITIAL = 2
+AIMD_MIN = 1
+AIMD_TARGET_P95_SEC = 2.0
+AIMD_WINDOW = 20
+AIMD_DECREASE_FACTOR = 0.5
+
+# Rate limit (token bucket shared by every request):
+# - steady-state request starts per second and how many may go out back-to-back
+# - optional lock file so several scraper processes on one machine share the budget
+MAX_REQUESTS_PER_SEC = 1.0
+REQUEST_BURST = 1
+RATE_LIMIT_LOCK_FILE = None   # e.g., "data/.ratelimit.lock"
+
+# On-disk HTTP cache: 200 responses are kept with their ETag/Last-Modified and
+# revalidated with conditional GETs; heats that started more than
+# HTTP_CACHE_IMMUTABLE_AFTER_DAYS ago are served from cache without any request.
+# Bodies are gzipped, and after each run the entries fetched longest ago are dropped
+# until the directory is under HTTP_CACHE_MAX_MB (0 = no limit). It pays off on local
+# and self-hosted runs; the scheduled GitHub workflow starts each run without it.
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_DIR = ".cache/http"
+HTTP_CACHE_IMMUTABLE_AFTER_DAYS = 7
+HTTP_CACHE_MAX_MB = 100
 
 # Stop conditions:
 # - how many consecutive missing heats (404 / empty page) before we assume we hit the end
 MAX_CONSECUTIVE_MISSES = 30
 
+# Frontier discovery (`--frontier`): after galloping + binary search lands on a
+# candidate newest heat, probe up to FRONTIER_MAX_GAP past it before trusting it, so
+# gaps in HeatNo numbering don't end the search early. Probes go every
+# FRONTIER_GAP_STRIDE heats (+2, +6, +10, ...): a gap followed by at least that many
+# heats is always crossed; a shorter run is picked up by a later run once it grows.
+FRONTIER_MAX_GAP = 64
+FRONTIER_GAP_STRIDE = 4
+
+# Pending re-probe queue: heats stored with no drivers, or scraped less than
+# PENDING_RECENT_HOURS after their start time, are re-scraped on an exponential
+# backoff until they have drivers and stop changing (or run out of attempts).
+SITE_TIMEZONE = "America/Los_Angeles"   # start_time_iso is site-local wall time
+PENDING_RECENT_HOURS = 6
+PENDING_BACKOFF_BASE_MIN = 15
+PENDING_BACKOFF_MAX_HOURS = 24
+PENDING_STABLE_CHECKS = 2
+PENDING_MAX_ATTEMPTS = 12
+PENDING_MAX_PER_RUN = 50
+
 # If you want to exclude heat types (e.g., Endurance Race), put display strings here
 EXCLUDE_HEAT_TYPES = []   # e.g., ["Endurance Race"]
 
+# Heats and indexes under data/ are written minified (orjson when installed), with
+# lap times as integer milliseconds ("laps_ms", "best_lap_ms"). Readers accept both
+# this and the older indent=2 / seconds format; `python -m scraper.compact` converts.
+STORAGE_COMPACT = True
+
+# "json": one file per heat under HEATS_DIR. "sqlite": heats go to SQLITE_FILE instead
+# (tables heats, driver_entries, laps; WAL, committed every SQLITE_BATCH_SIZE heats).
+# Fill it from an existing JSON tree with `python -m scraper.sqlite_store`.
+# "segments": heats are appended to JSONL segment files in SEGMENTS_DIR (a new one
+# every SEGMENT_MAX_BYTES) with an offset index saved every SEGMENT_INDEX_BATCH
+# writes; `python -m scraper.segments --import` / `--compact`.
+# The frontend still reads data/heats/*.json, so keep "json" where the site is published.
+STORAGE_BACKEND = "json"
+SQLITE_BATCH_SIZE = 200
+SEGMENT_MAX_BYTES = 4 << 20
+SEGMENT_INDEX_BATCH = 200
+
 # File system layout
 DATA_DIR = "data"
 HEATS_DIR = f"{DATA_DIR}/heats"
 LAST_HEAT_FILE = f"{DATA_DIR}/last_heat.txt"
 DRIVER_INDEX_FILE = f"{DATA_DIR}/driver_index.json"
+# driver_index.json split per driver: drivers/<slug>.json plus the drivers/index.json directory
+DRIVER_SHARDS_DIR = f"{DATA_DIR}/drivers"
+DRIVER_DIRECTORY_FILE = f"{DRIVER_SHARDS_DIR}/index.json"
+# Precomputed leaderboards (per normalized heat type and overall), refreshed with the index
+LEADERBOARD_DIR = f"{DATA_DIR}/leaderboards"
+# Track-wide fastest-lap rankings: top RANKING_TOP_K heat entries per (heat type, month)
+# and all-time, kept as bounded heaps in RANKINGS_DIR/_state/ (one file per bucket) between runs
+RANKINGS_DIR = f"{DATA_DIR}/rankings"
+RANKING_TOP_K = 100
+# Extra entries kept per heap beyond the K written, so a re-scraped heat dropping out of
+# a bucket rarely forces a refill of that bucket from the whole stored history
+RANKING_HEADROOM = 50
 SUMMARY_FILE = f"{DATA_DIR}/summary.json"
+FRONTIER_FILE = f"{DATA_DIR}/frontier.json"
+PENDING_FILE = f"{DATA_DIR}/pending_heats.json"
+
+# Raw HeatDetails HTML, gzipped as raw/<heat_no>/<fetch time>.html.gz, so parser
+# changes can be rolled out with `python -m scraper.reparse` instead of re-downloading.
+# Opt-in (or `--archive`): pages carry several KB of viewstate each, and the directory
+# is gitignored so the scheduled job's `git add data/` never commits it.
+ARCHIVE_RAW_HTML = False
+ARCHIVE_DIR = f"{DATA_DIR}/raw"
 WATCHLIST_FILE = f"{DATA_DIR}/drivers_watchlist.json"
+SQLITE_FILE = f"{DATA_DIR}/heats.sqlite3"
+SEGMENTS_DIR = f"{DATA_DIR}/segments"
+# Columnar lap arrays (.npy, memory-mappable) built from the whole history by
+# `python -m scraper.lapstore`, or also on `--reindex` when enabled (needs numpy)
+LAP_STORE_ENABLED = False
+LAP_STORE_DIR = f"{DATA_DIR}/laps"
 
 # User-Agent for requests (helps avoid generic blocks)
 USER_AGENT = "PGPTimes-HeatScraper/1.0 (+github.com/kevhjel/PGPTimes)"
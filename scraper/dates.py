@@ -0,0 +1,73 @@
+from __future__ import annotations
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+from dateutil import parser as dtp
+
+# Shapes ClubSpeed actually renders, e.g. "8/23/2025 1:15 PM". Each maps a full
+# match to a datetime; anything else goes to dateutil's fuzzy parser as before.
+_Builder = Callable[[re.Match], datetime]
+
+def _hour12(h: str, ampm: str) -> int:
+    return int(h) % 12 + (12 if ampm.lower() == "pm" else 0)
+
+def _us_ampm(m: re.Match) -> datetime:
+    return datetime(int(m["y"]), int(m["mo"]), int(m["d"]), _hour12(m["h"], m["ampm"]), int(m["mi"]), int(m["s"] or 0))
+
+def _us_24h(m: re.Match) -> datetime:
+    return datetime(int(m["y"]), int(m["mo"]), int(m["d"]), int(m["h"]), int(m["mi"]), int(m["s"] or 0))
+
+def _us_date(m: re.Match) -> datetime:
+    return datetime(int(m["y"]), int(m["mo"]), int(m["d"]))
+
+def _iso(m: re.Match) -> datetime:
+    return datetime(int(m["y"]), int(m["mo"]), int(m["d"]), int(m["h"]), int(m["mi"]), int(m["s"] or 0))
+
+_FORMATS: List[Tuple[str, re.Pattern, _Builder]] = [
+    ("m/d/Y h:M[:S] AM/PM", re.compile(
+        r"(?P<mo>\d{1,2})/(?P<d>\d{1,2})/(?P<y>\d{4})\s+(?P<h>0?[1-9]|1[0-2]):(?P<mi>[0-5]\d)(?::(?P<s>[0-5]\d))?\s*(?P<ampm>[AaPp][Mm])"),
+     _us_ampm),
+    ("m/d/Y H:M[:S]", re.compile(
+        r"(?P<mo>\d{1,2})/(?P<d>\d{1,2})/(?P<y>\d{4})\s+(?P<h>[01]?\d|2[0-3]):(?P<mi>[0-5]\d)(?::(?P<s>[0-5]\d))?"),
+     _us_24h),
+    ("m/d/Y", re.compile(r"(?P<mo>\d{1,2})/(?P<d>\d{1,2})/(?P<y>\d{4})"), _us_date),
+    ("Y-m-dTH:M[:S]", re.compile(
+        r"(?P<y>\d{4})-(?P<mo>\d{2})-(?P<d>\d{2})[T ](?P<h>[01]\d|2[0-3]):(?P<mi>[0-5]\d)(?::(?P<s>[0-5]\d))?"),
+     _iso),
+]
+
+# index into _FORMATS of the shape that matched last; pages from one site are
+# uniform, so it is almost always the first and only pattern tried
+_last_hit = 0
+
+def _match_known(text: str) -> Optional[datetime]:
+    global _last_hit
+    order = [_last_hit] + [i for i in range(len(_FORMATS)) if i != _last_hit]
+    for i in order:
+        m = _FORMATS[i][1].fullmatch(text)
+        if m:
+            try:
+                dt = _FORMATS[i][2](m)
+            except ValueError:
+                return None  # e.g. 2/30/2025: let dateutil have the final word
+            _last_hit = i
+            return dt
+    return None
+
+@lru_cache(maxsize=4096)
+def parse_datetime_iso(text: str) -> Optional[str]:
+    """
+    ISO string for a date/time label, or None. Known ClubSpeed shapes are parsed
+    with compiled patterns; everything else uses dateutil (fuzzy, month-first),
+    whose output the fast path reproduces exactly.
+    """
+    if not text:
+        return None
+    dt = _match_known(text.strip())
+    if dt is not None:
+        return dt.isoformat()
+    try:
+        return dtp.parse(text, fuzzy=True, dayfirst=False).isoformat()
+    except Exception:
+        return None
@@ -0,0 +1,63 @@
+from __future__ import annotations
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+from . import config
+
+Heat = Optional[Dict[str, Any]]
+
+class FrontierSearch:
+    """
+    Find the newest existing HeatNo with O(log n) probes instead of walking
+    forward until MAX_CONSECUTIVE_MISSES misses in a row.
+
+    Every probe is a real scrape; results are cached so the main loop can reuse
+    them through `scrape()` instead of fetching those heats a second time.
+    """
+
+    def __init__(self, scrape: Callable[[int], Heat]):
+        self._scrape = scrape
+        self.cache: Dict[int, Heat] = {}
+        self.probes = 0
+
+    def exists(self, heat_no: int) -> bool:
+        if heat_no not in self.cache:
+            self.probes += 1
+            heat = self._scrape(heat_no)
+            # ParsePipeline.scrape hands back a Future of the heat
+            self.cache[heat_no] = heat.result() if isinstance(heat, Future) else heat
+        return self.cache[heat_no] is not None
+
+    def scrape(self, heat_no: int) -> Heat:
+        """Drop-in for run.scrape_heat that serves already-probed heats from the cache."""
+        if heat_no in self.cache:
+            return self.cache.pop(heat_no)
+        return self._scrape(heat_no)
+
+    def find(self, known: int) -> int:
+        """
+        Return the highest existing heat number >= `known` (which is assumed to exist,
+        or to be a lower bound when nothing has been scraped yet).
+
+        Gallop +1, +2, +4, ... until a miss, binary-search the bracket, then probe
+        +2, +2 + FRONTIER_GAP_STRIDE, ... up to FRONTIER_MAX_GAP past the result; a hit
+        there means we stopped at a numbering gap, so the search resumes from it.
+        """
+        lo = known
+        while True:
+            base, step = lo, 1
+            while self.exists(base + step):
+                lo = base + step
+                step *= 2
+            hi = base + step
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if self.exists(mid):
+                    lo = mid
+                else:
+                    hi = mid
+            for off in range(2, config.FRONTIER_MAX_GAP + 1, max(1, config.FRONTIER_GAP_STRIDE)):
+                if self.exists(lo + off):
+                    lo += off
+                    break
+            else:
+                return lo
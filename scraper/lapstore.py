@@ -0,0 +1,188 @@
+from __future__ import annotations
+import argparse
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from . import config, storage
+
+try:
+    import numpy as np  # optional: the lap store is skipped when numpy isn't installed
+except ImportError:
+    np = None
+
+# One .npy per column under LAP_STORE_DIR, so each can be memory-mapped on its own.
+# Per lap, in (heat_no, driver entry, lap) order:
+LAP_COLUMNS = {
+    "lap_time_ms": "int32",
+    "lap_index": "int16",      # 1-based lap number within the entry
+    "position": "int16",       # -1 when unknown
+    "driver_id": "int32",      # row of meta.json "drivers"
+    "heat_id": "int32",        # heat_no
+    "start_time": "datetime64[s]",
+}
+# Per driver entry (one driver in one heat); laps of entry i are entry_offsets[i]:entry_offsets[i+1]
+ENTRY_COLUMNS = {
+    "entry_offsets": "int64",
+    "entry_heat": "int32",
+    "entry_driver": "int32",
+    "entry_best_ms": "int32",  # -1 when unknown
+}
+# Per heat; entries of heat j are heat_offsets[j]:heat_offsets[j+1]
+HEAT_COLUMNS = {
+    "heat_offsets": "int64",
+    "heat_no": "int32",
+    "heat_start": "datetime64[s]",
+    "heat_type_id": "int32",   # row of meta.json "heat_types"
+}
+
+def available() -> bool:
+    return np is not None
+
+def _start(iso: Optional[str]):
+    try:
+        return np.datetime64(iso, "s") if iso else np.datetime64("NaT", "s")
+    except ValueError:
+        return np.datetime64("NaT", "s")
+
+def build(heat_nos: Optional[Iterable[int]] = None, directory: Optional[str] = None) -> "LapStore":
+    """Flatten the stored heats (all by default) into the columnar store and write it to `directory`."""
+    if np is None:
+        raise RuntimeError("the lap store needs numpy (pip install numpy)")
+    directory = directory or config.LAP_STORE_DIR
+    docs = sorted(storage.iter_heats(heat_nos), key=lambda x: x[0])
+    drivers: Dict[str, int] = {}
+    heat_types: Dict[str, int] = {}
+    laps: Dict[str, List[Any]] = {k: [] for k in LAP_COLUMNS}
+    entries: Dict[str, List[Any]] = {k: [] for k in ENTRY_COLUMNS}
+    heats: Dict[str, List[Any]] = {k: [] for k in HEAT_COLUMNS}
+    entries["entry_offsets"].append(0)
+    heats["heat_offsets"].append(0)
+    for heat_no, doc in docs:
+        start = _start(doc.get("start_time_iso"))
+        for d in doc.get("drivers") or []:
+            name = (d.get("name") or "").strip()
+            if not name:
+                continue
+            driver_id = drivers.setdefault(name, len(drivers))
+            positions = d.get("lap_positions") or []
+            n = 0
+            for i, t in enumerate(d.get("laps") or []):
+                if t is None or t <= 0:  # the site records some untimed laps as 0.000
+                    continue
+                laps["lap_time_ms"].append(round(t * 1000))
+                laps["lap_index"].append(i + 1)
+                p = positions[i] if i < len(positions) else None
+                laps["position"].append(p if p is not None else -1)
+                laps["driver_id"].append(driver_id)
+                laps["heat_id"].append(heat_no)
+                laps["start_time"].append(start)
+                n += 1
+            best = d.get("best_lap_seconds")
+            entries["entry_offsets"].append(entries["entry_offsets"][-1] + n)
+            entries["entry_heat"].append(heat_no)
+            entries["entry_driver"].append(driver_id)
+            entries["entry_best_ms"].append(round(best * 1000) if best is not None else -1)
+        heats["heat_offsets"].append(len(entries["entry_heat"]))
+        heats["heat_no"].append(heat_no)
+        heats["heat_start"].append(start)
+        heats["heat_type_id"].append(heat_types.setdefault((doc.get("heat_type") or "").strip(), len(heat_types)))
+
+    os.makedirs(directory, exist_ok=True)
+    columns = {}
+    for spec, values in ((LAP_COLUMNS, laps), (ENTRY_COLUMNS, entries), (HEAT_COLUMNS, heats)):
+        for name, dtype in spec.items():
+            arr = np.array(values[name], dtype=dtype)
+            tmp = os.path.join(directory, f"{name}.npy.tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp, os.path.join(directory, f"{name}.npy"))
+            columns[name] = arr
+    meta = {"drivers": list(drivers), "heat_types": list(heat_types), "laps": len(laps["lap_time_ms"])}
+    storage.write_json(os.path.join(directory, "meta.json"), meta)
+    return LapStore(columns, meta)
+
+def load(directory: Optional[str] = None, mmap: bool = True) -> "LapStore":
+    """Open a built store; with `mmap` the columns are memory-mapped read-only instead of read in."""
+    if np is None:
+        raise RuntimeError("the lap store needs numpy (pip install numpy)")
+    directory = directory or config.LAP_STORE_DIR
+    meta = storage.read_json(os.path.join(directory, "meta.json"))
+    columns = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+        for spec in (LAP_COLUMNS, ENTRY_COLUMNS, HEAT_COLUMNS) for name in spec
+    }
+    return LapStore(columns, meta)
+
+class LapStore:
+    """Columns of a built store (attributes named as in LAP_COLUMNS etc.) plus whole-history analytics."""
+
+    def __init__(self, columns: Dict[str, Any], meta: Dict[str, Any]):
+        for name, arr in columns.items():
+            setattr(self, name, arr)
+        self.drivers: List[str] = meta["drivers"]
+        self.heat_types: List[str] = meta["heat_types"]
+        self._driver_ids = {name: i for i, name in enumerate(self.drivers)}
+
+    def driver_laps(self, name: str):
+        """Boolean lap mask for one driver."""
+        return self.driver_id == self._driver_ids.get(name, -1)
+
+    def personal_bests(self) -> Dict[str, int]:
+        """{driver: fastest lap ms} over every recorded lap."""
+        best = np.full(len(self.drivers), np.iinfo(np.int32).max, dtype=np.int32)
+        np.minimum.at(best, self.driver_id, self.lap_time_ms)
+        return {self.drivers[i]: int(ms) for i, ms in enumerate(best) if ms != np.iinfo(np.int32).max}
+
+    def percentiles(self, q: Iterable[float] = (50, 90, 99), name: Optional[str] = None) -> Dict[float, float]:
+        """Lap time percentiles in ms, track-wide or for one driver."""
+        times = self.lap_time_ms if name is None else self.lap_time_ms[self.driver_laps(name)]
+        if not len(times):
+            return {}
+        q = list(q)
+        return dict(zip(q, (float(v) for v in np.percentile(times, q))))
+
+    def consistency(self, min_laps: int = 20) -> Dict[str, float]:
+        """
+        {driver: coefficient of variation of lap times} for drivers with at least
+        `min_laps` laps; lower is steadier.
+        """
+        ids = self.driver_id
+        t = self.lap_time_ms.astype(np.float64)
+        n = np.bincount(ids, minlength=len(self.drivers))
+        s = np.bincount(ids, weights=t, minlength=len(self.drivers))
+        s2 = np.bincount(ids, weights=t * t, minlength=len(self.drivers))
+        out: Dict[str, float] = {}
+        for i in np.nonzero(n >= max(2, min_laps))[0]:
+            mean = s[i] / n[i]
+            var = max(s2[i] / n[i] - mean * mean, 0.0)
+            out[self.drivers[i]] = float(np.sqrt(var) / mean)
+        return out
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Build the columnar lap store from stored heats and print a few stats")
+    p.add_argument("--top", type=int, default=10, help="personal bests to list")
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    if np is None:
+        raise SystemExit("numpy is not installed; pip install numpy to build the lap store.")
+    started = time.monotonic()
+    build()
+    built = time.monotonic() - started
+    store = load()
+    started = time.monotonic()
+    bests = store.personal_bests()
+    pct = store.percentiles()
+    steady = store.consistency()
+    took = time.monotonic() - started
+    print(f"Lap store: {len(store.lap_time_ms)} lap(s), {len(store.drivers)} driver(s), "
+          f"{len(store.heat_no)} heat(s) in {config.LAP_STORE_DIR} (built in {built:.2f}s).")
+    print(f"Analytics in {took * 1000:.1f} ms. Lap time percentiles (s): "
+          + ", ".join(f"p{q:g} {v / 1000:.3f}" for q, v in pct.items()))
+    for name, ms in sorted(bests.items(), key=lambda x: x[1])[:args.top]:
+        cv = steady.get(name)
+        print(f"  {ms / 1000:8.3f}  {name}" + (f"  (cv {cv:.3f})" if cv is not None else ""))
+
+if __name__ == "__main__":
+    main()
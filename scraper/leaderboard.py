@@ -0,0 +1,118 @@
+from __future__ import annotations
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from . import config, storage
+
+# Leaderboards under LEADERBOARD_DIR, one file per normalized heat type plus "overall":
+#   all/<slug>.json        every driver with a timed lap, fastest first
+#   watchlist/<slug>.json  the drivers_watchlist.json names (drivers without laps last)
+#   index.json             the available types, for the page's selector
+# Each file is {"type", "columns", "rows"} with rows as lists in COLUMNS order.
+COLUMNS = ["name", "best_lap_seconds", "heat_no", "heat_type", "start_time_iso", "laps"]
+OVERALL = "overall"
+
+Row = List[Any]
+
+def normalize_heat_type(heat_type: Optional[str]) -> str:
+    """'Arrive and Drive- 18 Karts' / 'Arrive and Drive -15 Karts' -> 'Arrive and Drive - 18 Karts' etc."""
+    t = re.sub(r"\s*-\s*", " - ", heat_type or "")
+    return re.sub(r"\s+", " ", t).strip(" -")
+
+def type_slug(heat_type: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", heat_type.lower()).strip("-") or "untyped"
+
+def fastest_lap(ent: Dict[str, Any]) -> Optional[float]:
+    """Fastest timed lap of a driver entry (heat document or index entry), in seconds."""
+    # the site records some untimed laps as 0.000; they don't count
+    times = [t for t in (ent.get("laps") or []) if t is not None and t > 0]
+    best = ent.get("best_lap_seconds")
+    if best is not None and best > 0:
+        times.append(best)
+    return min(times) if times else None
+
+def driver_rows(name: str, entries: Iterable[Dict[str, Any]]) -> Dict[str, Row]:
+    """{type slug or OVERALL: row} with the driver's record in each heat type they ran."""
+    best: Dict[str, Tuple[float, Row]] = {}
+    for ent in entries:
+        t = fastest_lap(ent)
+        if t is None:
+            continue
+        row = [name, t, ent.get("heat_no"), ent.get("heat_type"), ent.get("start_time_iso"),
+               len(ent.get("laps") or [])]
+        for key in (OVERALL, type_slug(normalize_heat_type(ent.get("heat_type")))):
+            if key not in best or t < best[key][0]:
+                best[key] = (t, row)
+    return {k: row for k, (_, row) in best.items()}
+
+def _sort_key(row: Row):
+    return (row[1] is None, row[1] or 0.0, row[0])
+
+def _path(group: str, slug: str) -> str:
+    return os.path.join(config.LEADERBOARD_DIR, group, f"{slug}.json")
+
+def _load_boards() -> Optional[Dict[str, Dict[str, Row]]]:
+    try:
+        index = storage.read_json(os.path.join(config.LEADERBOARD_DIR, "index.json"))
+        return {t["slug"]: {r[0]: r for r in storage.read_json(_path("all", t["slug"]))["rows"]}
+                for t in index["types"]}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def update(drivers: Dict[str, List[Dict[str, Any]]], touched: Optional[Iterable[str]] = None):
+    """
+    Refresh the leaderboards from the driver index `drivers`. With `touched`, only those
+    drivers' rows are recomputed and only the types they appear in rewritten; without it
+    (or when no leaderboards exist yet) everything is rebuilt.
+    """
+    boards = _load_boards() if touched is not None else None
+    if boards is None:
+        boards, changed = {}, None
+        names: Iterable[str] = drivers
+    else:
+        changed = set()
+        names = set(touched)
+        for slug, rows in boards.items():
+            for name in names:
+                if rows.pop(name, None) is not None:
+                    changed.add(slug)
+    labels: Dict[str, str] = {OVERALL: "Overall"}
+    for name in names:
+        for slug, row in driver_rows(name, drivers.get(name, [])).items():
+            boards.setdefault(slug, {})[name] = row
+            if changed is not None:
+                changed.add(slug)
+    # display labels from the records themselves
+    for slug, rows in boards.items():
+        if slug != OVERALL and rows:
+            labels[slug] = normalize_heat_type(next(iter(rows.values()))[3]) or "Untyped"
+    boards = {slug: rows for slug, rows in boards.items() if rows or slug == OVERALL}
+    _write(boards, labels, changed)
+
+def _write(boards: Dict[str, Dict[str, Row]], labels: Dict[str, str], changed: Optional[set]):
+    for group in ("all", "watchlist"):
+        os.makedirs(os.path.join(config.LEADERBOARD_DIR, group), exist_ok=True)
+    watch = storage.read_watchlist()
+    for slug, rows in boards.items():
+        if changed is None or slug in changed:
+            ranked = sorted(rows.values(), key=_sort_key)
+            storage.write_json(_path("all", slug), {"type": labels.get(slug, slug), "columns": COLUMNS, "rows": ranked})
+        # the watchlist can change between runs, so its boards are always rewritten (they're small)
+        listed = [rows.get(n) or [n, None, None, None, None, None] for n in dict.fromkeys(watch)]
+        storage.write_json(_path("watchlist", slug), {
+            "type": labels.get(slug, slug), "columns": COLUMNS, "rows": sorted(listed, key=_sort_key),
+        })
+    for group in ("all", "watchlist"):
+        d = os.path.join(config.LEADERBOARD_DIR, group)
+        for fn in os.listdir(d):
+            if fn.endswith(".json") and fn[:-5] not in boards:
+                os.remove(os.path.join(d, fn))
+    types = [{"slug": OVERALL, "type": labels[OVERALL], "drivers": len(boards.get(OVERALL, {}))}]
+    types += sorted(({"slug": s, "type": labels.get(s, s), "drivers": len(r)} for s, r in boards.items() if s != OVERALL),
+                    key=lambda t: (-t["drivers"], t["type"]))
+    storage.write_json(os.path.join(config.LEADERBOARD_DIR, "index.json"), {
+        "last_updated_utc": datetime.now(timezone.utc).isoformat(),
+        "watchlist": len(watch),
+        "types": types,
+    })
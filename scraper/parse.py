@@ -1,8 +1,11 @@
 from __future__ import annotations
+import threading
+from collections import Counter
 from bs4 import BeautifulSoup
+from lxml import etree
 from typing import Dict, List, Optional, Tuple
 import re
-from dateutil import parser as dtp
+from .dates import parse_datetime_iso
 
 # ------------------------------
 # helpers
@@ -14,14 +17,8 @@ def _get_text(el) -> str:
     return " ".join(el.get_text(separator=" ", strip=True).split())
 
 def _maybe_parse_datetime(text: str) -> Optional[str]:
-    if not text:
-        return None
-    try:
-        # US-style dates like 8/23/2025 1:15 PM parse fine with dateutil
-        dt = dtp.parse(text, fuzzy=True, dayfirst=False)
-        return dt.isoformat()
-    except Exception:
-        return None
+    # US-style dates like 8/23/2025 1:15 PM; unknown shapes fall back to dateutil
+    return parse_datetime_iso(text)
 
 def _parse_time_to_seconds(s: str) -> Optional[float]:
     s = (s or "").strip()
@@ -35,16 +32,50 @@ def _parse_time_to_seconds(s: str) -> Optional[float]:
     except Exception:
         return None
 
+# Stamped into every heat document as "parser_version". Bump it whenever a change
+# here alters parser output, so `python -m scraper.reparse` knows which files are stale.
+PARSER_VERSION = 1
+
+# how often the parser had to go past its cheap selectors, by fallback
+FALLBACK_COUNTS: Counter = Counter()
+_counts_lock = threading.Lock()
+
+def _count(key: str):
+    with _counts_lock:
+        FALLBACK_COUNTS[key] += 1
+
+def fallback_counts() -> Dict[str, int]:
+    with _counts_lock:
+        return dict(FALLBACK_COUNTS)
+
+def add_fallback_counts(counts: Dict[str, int]):
+    """Merge counts gathered elsewhere (e.g. in a parser worker process)."""
+    with _counts_lock:
+        FALLBACK_COUNTS.update(counts)
+
+_RE_HEAT_NO = re.compile(r"(?:Heat\s*#?\s*|HeatNo\s*[:=]\s*)(\d+)", re.I)
+_RE_TYPE_LABEL = re.compile(r"(heat|race)\s*type", re.I)
+_RE_TIME_LABEL = re.compile(r"(start\s*time|date\s*time|session\s*time)", re.I)
+_HEADING_TAGS = frozenset(("h1", "h2", "h3", "span", "div"))
+_LABEL_TAGS = frozenset(("td", "span", "div", "th"))
+
 # ------------------------------
 # main page parser
 # ------------------------------
 
-def parse_heat_details_html(html: str) -> Dict:
+def parse_heat_details_html(html: str, engine: str = "auto", expected_heat_no: Optional[int] = None) -> Dict:
     """
     Parse a HeatDetails.aspx page, prioritizing:
       - driver/laps from LapTimesContainer
       - start time from exact #lblDate
 
+    engine: "auto" tries the lxml fast path and falls back to BeautifulSoup when
+    the page isn't the plain LapTimesContainer layout; "lxml" / "bs4" force one
+    ("lxml" returns None for pages it can't handle).
+
+    expected_heat_no: the HeatNo the caller requested; used when <title> doesn't
+    carry one, instead of scanning the page's headings for it.
+
     Returns:
     {
       "heat_no": int,
@@ -53,35 +84,207 @@ def parse_heat_details_html(html: str) -> Dict:
       "drivers": [...]
     }
     """
-    soup = BeautifulSoup(html, "lxml")
+    if engine in ("auto", "lxml"):
+        heat = _parse_heat_details_lxml(html, expected_heat_no)
+        if heat is not None or engine == "lxml":
+            return heat
+        _count("engine_bs4")
+    return _parse_heat_details_bs4(html, expected_heat_no)
 
-    # ---- heat number ----------
-    heat_no = None
-    title_text = _get_text(soup.find("title"))
-    m = re.search(r"(?:Heat\s*#?\s*|HeatNo\s*[:=]\s*)(\d+)", title_text, re.I)
+# ------------------------------
+# lxml fast path (LapTimesContainer layout)
+# ------------------------------
+
+_RE_LAP_NO = re.compile(r"\d+")
+_RE_RACE_TYPE_ID = re.compile(r"lblRaceType", re.I)
+_RE_CONTAINER_CLASS = re.compile(r"\bLapTimesContainer\b", re.I)
+_RE_POS = re.compile(r"\[(\d+)\]")
+_RE_BRACKETS = re.compile(r"\[[^\]]+\]")
+
+_XNS = {"re": "http://exslt.org/regular-expressions"}
+_X_TITLE = etree.XPath("(//title)[1]")
+_X_RACE_TYPE = etree.XPath("(//*[re:test(@id, 'lblRaceType', 'i')])[1]", namespaces=_XNS)
+_X_DATE = etree.XPath("(//*[@id='lblDate'])[1]")
+_X_CONTAINER = etree.XPath(r"(//table[re:test(@class, '\bLapTimesContainer\b', 'i')])[1]", namespaces=_XNS)
+_X_DRIVER_TABLES = etree.XPath(r".//table[re:test(@class, '\bLapTimes\b', 'i')]", namespaces=_XNS)
+_X_FIRST_TH = etree.XPath("(.//th)[1]")
+_X_ROWS = etree.XPath(".//tr")
+_X_CELLS = etree.XPath(".//td")
+
+# BeautifulSoup's get_text() leaves out strings inside these (and comments)
+_TEXT_SKIP = frozenset(("script", "style", "template", "rt", "rp"))
+
+def _lx_strings(node, parts: List[str], top: bool = False):
+    if not isinstance(node.tag, str) or (not top and node.tag in _TEXT_SKIP):
+        return
+    if node.text:
+        parts.append(node.text)
+    for child in node:
+        _lx_strings(child, parts)
+        if child.tail:
+            parts.append(child.tail)
+
+def _lx_text(el) -> str:
+    """lxml twin of _get_text(): same whitespace-collapsed text BeautifulSoup would give."""
+    if el is None:
+        return ""
+    parts: List[str] = []
+    _lx_strings(el, parts, top=True)
+    return " ".join(" ".join(parts).split())
+
+def _first(xpath, node):
+    found = xpath(node)
+    return found[0] if found else None
+
+def _lx_root(html: str):
+    parser = etree.HTMLParser(encoding="utf-8")
+    try:
+        return etree.fromstring(html.encode("utf-8"), parser)
+    except (etree.ParserError, ValueError):
+        return None
+
+def _parse_heat_details_lxml(html: str, expected_heat_no: Optional[int] = None) -> Optional[Dict]:
+    """
+    Precompiled-XPath parser for pages with a LapTimesContainer, #lblDate, an
+    lblRaceType label and the heat number in <title> (or `expected_heat_no`). Returns None whenever one of
+    those is missing so the caller can use the BeautifulSoup parser, which has the
+    fallbacks; when it does return, the dict equals what that parser produces.
+    """
+    root = _lx_root(html)
+    if root is None:
+        return None
+    return _heat_from_lxml_root(root, expected_heat_no)
+
+def _heat_from_lxml_root(root, expected_heat_no: Optional[int] = None) -> Optional[Dict]:
+    container = _first(_X_CONTAINER, root)
+    if container is None:
+        return None
+    m = _RE_HEAT_NO.search(_lx_text(_first(_X_TITLE, root)))
+    heat_no = int(m.group(1)) if m else expected_heat_no
+    race_type_node = _first(_X_RACE_TYPE, root)
+    date_node = _first(_X_DATE, root)
+    if heat_no is None or race_type_node is None or date_node is None:
+        return None
+    start_time_iso = _maybe_parse_datetime(_lx_text(date_node))
+    if not start_time_iso:
+        return None
     if not m:
-        for hx in soup.find_all(["h1", "h2", "h3", "span", "div"]):
-            t = _get_text(hx)
-            mm = re.search(r"(?:Heat\s*#?\s*|HeatNo\s*[:=]\s*)(\d+)", t, re.I)
-            if mm:
-                m = mm
+        _count("heat_no_expected")
+
+    drivers: List[Dict] = []
+    for dtbl in _X_DRIVER_TABLES(container):
+        name = _lx_text(_first(_X_FIRST_TH, dtbl))
+        laps: List[float] = []
+        lap_positions: List[int] = []
+        for tr in _X_ROWS(dtbl):
+            tds = _X_CELLS(tr)
+            if len(tds) < 2:
+                continue
+            if not _RE_LAP_NO.fullmatch(_lx_text(tds[0])):
+                continue
+            val = _lx_text(tds[1])
+            mpos = _RE_POS.search(val)
+            tsec = _parse_time_to_seconds(_RE_BRACKETS.sub("", val).strip())
+            if tsec is None:
+                continue
+            laps.append(tsec)
+            lap_positions.append(int(mpos.group(1)) if mpos else -1)
+
+        finish_pos = None
+        for p in reversed(lap_positions):
+            if p > 0:
+                finish_pos = p
                 break
+        drivers.append({
+            "name": name,
+            "position": finish_pos,
+            "kart": None,
+            "best_lap_seconds": min(laps) if laps else None,
+            "lap_times_url": None,
+            "laps": laps if laps else None,
+            "lap_positions": lap_positions if lap_positions else None,
+        })
+
+    return {
+        "heat_no": heat_no,
+        "heat_type": _lx_text(race_type_node),
+        "start_time_iso": start_time_iso,
+        "drivers": drivers,
+    }
+
+class StreamingHeatParser:
+    """
+    Incremental twin of the lxml fast path for a HeatDetails response read in chunks.
+
+    feed() returns True once everything the fast path needs has been seen: the
+    LapTimesContainer table has closed, and <title> (or `expected_heat_no`), #lblDate and
+    lblRaceType are known. The caller can stop reading there; result() then
+    extracts the heat from the partial tree. ASP.NET viewstate values and script
+    bodies are dropped as they close, so they never pile up in memory.
+    result() returns None if the page isn't the fast-path layout, in which case the
+    caller should read the rest and use parse_heat_details_html() on the full text.
+    """
+
+    def __init__(self, expected_heat_no: Optional[int] = None, encoding: str = "utf-8"):
+        self.expected_heat_no = expected_heat_no
+        self._parser = etree.HTMLPullParser(events=("end",), encoding=encoding)
+        self._heat_no_known = expected_heat_no is not None
+        self._race_type = False
+        self._date = False
+        self._container_closed = False
+        self.done = False
+
+    def feed(self, chunk: bytes) -> bool:
+        if self.done:
+            return True
+        self._parser.feed(chunk)
+        for _, el in self._parser.read_events():
+            tag = el.tag
+            el_id = el.get("id") or ""
+            if tag == "title" and not self._heat_no_known:
+                self._heat_no_known = bool(_RE_HEAT_NO.search(_lx_text(el)))
+            elif tag in ("script", "style"):
+                el.text = None
+            elif tag == "input" and (el.get("type") or "").lower() == "hidden":
+                el.attrib.pop("value", None)
+            if el_id == "lblDate":
+                self._date = True
+            if not self._race_type and _RE_RACE_TYPE_ID.search(el_id):
+                self._race_type = True
+            if tag == "table" and not self._container_closed and _RE_CONTAINER_CLASS.search(el.get("class") or ""):
+                self._container_closed = True
+        self.done = self._container_closed and self._race_type and self._date and self._heat_no_known
+        return self.done
+
+    def result(self) -> Optional[Dict]:
+        try:
+            root = self._parser.close()
+        except etree.LxmlError:
+            return None
+        if root is None:
+            return None
+        return _heat_from_lxml_root(root, self.expected_heat_no)
+
+# ------------------------------
+# BeautifulSoup parser (any layout)
+# ------------------------------
+
+def _parse_heat_details_bs4(html: str, expected_heat_no: Optional[int] = None) -> Dict:
+    soup = BeautifulSoup(html, "lxml")
+
+    # ---- cheap, exact selectors first ----------
+    heat_no = None
+    m = _RE_HEAT_NO.search(_get_text(soup.find("title")))
     if m:
         heat_no = int(m.group(1))
+    elif expected_heat_no is not None:
+        heat_no = expected_heat_no
+        _count("heat_no_expected")
 
-    # ---- heat type ------------
     heat_type = ""
     race_type_node = soup.find(id=re.compile(r"lblRaceType", re.I))
     if race_type_node:
         heat_type = _get_text(race_type_node)
-    else:
-        for label in soup.find_all(["td", "span", "div", "th"]):
-            t = _get_text(label)
-            if re.search(r"(heat|race)\s*type", t, re.I):
-                nxt = label.find_next(["td", "span", "div"])
-                if nxt:
-                    heat_type = _get_text(nxt)
-                    break
 
     # ---- start date/time (STRICT: from #lblDate) ----
     start_time_iso = None
@@ -93,8 +296,16 @@ def parse_heat_details_html(html: str) -> Dict:
 
     # 2) If still missing, look for a table row where left cell contains #lblDate1 ("Date")
     #    and the right sibling cell (HeatResultsRightCell) holds the value.
+    #    Only rows around a #lblDate1 can qualify, so walk those (outermost first,
+    #    i.e. document order) instead of probing every <tr> on the page.
     if not start_time_iso:
-        for tr in soup.find_all("tr"):
+        rows, seen = [], set()
+        for lbl in soup.find_all(id="lblDate1"):
+            for tr in reversed(lbl.find_parents("tr")):
+                if id(tr) not in seen:
+                    seen.add(id(tr))
+                    rows.append(tr)
+        for tr in rows:
             left = tr.find("td", class_=re.compile(r"\bHeatResultsLeftCell\b", re.I))
             right = tr.find("td", class_=re.compile(r"\bHeatResultsRightCell\b", re.I))
             if not left or not right:
@@ -106,18 +317,46 @@ def parse_heat_details_html(html: str) -> Dict:
                 txt = _get_text(span) if span else _get_text(right)
                 start_time_iso = _maybe_parse_datetime(txt)
                 if start_time_iso:
+                    _count("start_time_date_row")
                     break
 
-    # 3) LAST resort (avoid pulling the wrong thing): any obvious date-ish label/value nearby
-    if not start_time_iso:
-        for label in soup.find_all(["td", "span", "div", "th"]):
-            t = _get_text(label)
-            if re.search(r"(start\s*time|date\s*time|session\s*time)", t, re.I):
-                cand = _get_text(label.find_next(["td", "span", "div"]))
-                iso = _maybe_parse_datetime(cand)
+    # ---- one pass over the tree for whatever the selectors above missed ----
+    #  - heat number: first h1/h2/h3/span/div whose text names it
+    #  - heat type: element after the first td/span/div/th labelled "heat/race type"
+    #  - start time, LAST resort (avoid pulling the wrong thing): element after a
+    #    "start/date/session time" label, if it parses as a date
+    need_heat_no = heat_no is None
+    need_type = race_type_node is None
+    need_date = not start_time_iso
+    if need_heat_no or need_type or need_date:
+        for el in soup.find_all(["h1", "h2", "h3", "span", "div", "td", "th"]):
+            if not (need_heat_no or need_type or need_date):
+                break
+            want_heading = need_heat_no and el.name in _HEADING_TAGS
+            want_label = (need_type or need_date) and el.name in _LABEL_TAGS
+            if not (want_heading or want_label):
+                continue
+            t = _get_text(el)
+            if want_heading:
+                mm = _RE_HEAT_NO.search(t)
+                if mm:
+                    heat_no = int(mm.group(1))
+                    need_heat_no = False
+                    _count("heat_no_heading_scan")
+            if not want_label:
+                continue
+            if need_type and _RE_TYPE_LABEL.search(t):
+                nxt = el.find_next(["td", "span", "div"])
+                if nxt:
+                    heat_type = _get_text(nxt)
+                    need_type = False
+                    _count("heat_type_label_scan")
+            if need_date and _RE_TIME_LABEL.search(t):
+                iso = _maybe_parse_datetime(_get_text(el.find_next(["td", "span", "div"])))
                 if iso:
                     start_time_iso = iso
-                    break
+                    need_date = False
+                    _count("start_time_label_scan")
 
     # ------------------------------
     # Preferred path: LapTimesContainer
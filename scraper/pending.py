@@ -0,0 +1,127 @@
+from __future__ import annotations
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from . import config, storage
+
+Heat = Optional[Dict[str, Any]]
+
+def _site_tz():
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(config.SITE_TIMEZONE)
+    except Exception:
+        return None
+
+def _start_utc(heat: Dict[str, Any]) -> Optional[datetime]:
+    iso = heat.get("start_time_iso")
+    if not iso:
+        return None
+    try:
+        dt = datetime.fromisoformat(iso)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        tz = _site_tz()
+        if tz is None:
+            return None
+        dt = dt.replace(tzinfo=tz)
+    return dt.astimezone(timezone.utc)
+
+def needs_recheck(heat: Dict[str, Any], now: datetime) -> bool:
+    """True for heats that may still change: no drivers yet, or not long past their start."""
+    if heat.get("skipped_reason"):
+        return False
+    if not heat.get("drivers"):
+        return True
+    if any(d.get("lap_times_url") and not d.get("laps") for d in heat["drivers"]):
+        # a LapTimes popup that failed (or was still empty) when the heat was scraped
+        return True
+    start = _start_utc(heat)
+    return start is not None and now < start + timedelta(hours=config.PENDING_RECENT_HOURS)
+
+def _backoff(attempts: int) -> timedelta:
+    delay = timedelta(minutes=config.PENDING_BACKOFF_BASE_MIN) * (2 ** attempts)
+    return min(delay, timedelta(hours=config.PENDING_BACKOFF_MAX_HOURS))
+
+def load() -> Dict[str, Dict[str, Any]]:
+    """Queue keyed by str(heat_no): {"attempts", "unchanged", "next_check_utc"}."""
+    if not os.path.exists(config.PENDING_FILE):
+        return {}
+    try:
+        return storage.read_json(config.PENDING_FILE).get("heats", {})
+    except Exception:
+        return {}
+
+def save(queue: Dict[str, Dict[str, Any]]):
+    ordered = {k: queue[k] for k in sorted(queue, key=int)}
+    storage.write_json(config.PENDING_FILE, {"heats": ordered})
+
+def enqueue(queue: Dict[str, Dict[str, Any]], heat_no: int, heat: Dict[str, Any], now: datetime) -> bool:
+    """Queue `heat` for a later re-probe if it may still change. Returns True if added."""
+    key = str(heat_no)
+    if key in queue or not needs_recheck(heat, now):
+        return False
+    queue[key] = {
+        "attempts": 0,
+        "unchanged": 0,
+        "next_check_utc": (now + _backoff(0)).isoformat(),
+    }
+    return True
+
+def enqueue_failed(queue: Dict[str, Dict[str, Any]], heat_no: int, now: datetime) -> bool:
+    """Queue a heat whose page kept failing this run (nothing stored for it yet, possibly). Returns True if added."""
+    key = str(heat_no)
+    if key in queue:
+        return False
+    queue[key] = {
+        "attempts": 0,
+        "unchanged": 0,
+        "next_check_utc": (now + _backoff(0)).isoformat(),
+    }
+    return True
+
+def due(queue: Dict[str, Dict[str, Any]], now: datetime, limit: int | None = None) -> List[int]:
+    heats = sorted(int(k) for k, v in queue.items() if datetime.fromisoformat(v["next_check_utc"]) <= now)
+    return heats[:limit] if limit is not None else heats
+
+def record(queue: Dict[str, Dict[str, Any]], heat_no: int, fresh: Heat, now: datetime) -> bool:
+    """
+    Apply one re-probe result. The heat counts as changed only when its content
+    did (the parser/source stamps aside); the entry is dropped once the heat has
+    settled or after PENDING_MAX_ATTEMPTS probes. Returns True if the content changed
+    and the heat file was rewritten.
+    """
+    key = str(heat_no)
+    ent = queue[key]
+    ent["attempts"] += 1
+    changed = False
+    if fresh is not None:
+        stored = storage.read_heat(heat_no)
+        if not storage.same_heat(fresh, stored, stamps=False):
+            storage.write_heat(heat_no, fresh)
+            changed = True
+            ent["unchanged"] = 0
+        else:
+            ent["unchanged"] += 1
+            if not storage.same_heat(fresh, stored):
+                # same heat from different bytes (viewstate, --stream cut-off): refresh
+                # the stamps so reparse.is_current() matches the newest snapshot
+                storage.write_heat(heat_no, {**stored, **{k: fresh[k] for k in storage.STAMP_FIELDS if k in fresh}})
+    settled = fresh is not None and fresh.get("drivers") and (
+        not needs_recheck(fresh, now) or ent["unchanged"] >= config.PENDING_STABLE_CHECKS
+    )
+    if settled or (fresh is not None and fresh.get("skipped_reason")) or ent["attempts"] >= config.PENDING_MAX_ATTEMPTS:
+        del queue[key]
+    else:
+        ent["next_check_utc"] = (now + _backoff(ent["attempts"])).isoformat()
+    return changed
+
+def seed_from_storage(queue: Dict[str, Dict[str, Any]], now: datetime) -> int:
+    """One-shot: queue every stored heat that still needs a re-probe."""
+    added = 0
+    for h in storage.list_heat_files():
+        doc = storage.read_heat(h)
+        if doc is not None and enqueue(queue, h, doc, now):
+            added += 1
+    return added
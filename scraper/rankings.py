@@ -0,0 +1,204 @@
+from __future__ import annotations
+import heapq
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from . import config, storage
+from .leaderboard import OVERALL, fastest_lap, normalize_heat_type, type_slug
+
+# Track-wide top-K of heat entries (a driver's fastest lap in one heat) per
+# (heat type, period) bucket: type is "overall" or a normalized heat-type slug,
+# period is "all" or the start month "YYYY-MM". Each bucket is a bounded heap that
+# keeps its K + RANKING_HEADROOM fastest entries while heats stream in from storage,
+# so memory is O(buckets x K) however long the history gets; the K fastest are written.
+#
+# RANKINGS_DIR/_state/ holds the heaps, one <type>/<period>.json per bucket plus meta.json.
+# Writes go to RANKINGS_DIR/<type>/<period>.json ({"type", "period", "columns", "rows"})
+# and RANKINGS_DIR/index.json.
+COLUMNS = ["lap_seconds", "name", "heat_no", "heat_type", "start_time_iso"]
+ALL_TIME = "all"
+
+# heap item: [-lap_ms, -heat_no, -entry_no, name, heat_type, start_time_iso]. Negated so
+# the heap root is the slowest kept entry, and ties break the same way however heats arrive.
+Item = List[Any]
+
+class Bucket:
+    def __init__(self, heap: Optional[List[Item]] = None, floor: Optional[List[Any]] = None):
+        self.heap = heap or []
+        # sort key (item[:3]) of the best entry ever turned away, None if none was. Kept
+        # entries above it are exactly the fastest there are; below it some may be missing.
+        self.floor = floor
+
+    def push(self, item: Item, capacity: int):
+        if len(self.heap) < capacity:
+            heapq.heappush(self.heap, item)
+            return
+        if item[:3] > self.heap[0][:3]:
+            item = heapq.heapreplace(self.heap, item)
+        if self.floor is None or item[:3] > self.floor:
+            self.floor = item[:3]
+
+    def drop_heats(self, heat_nos: Set[int]) -> bool:
+        kept = [it for it in self.heap if -it[1] not in heat_nos]
+        if len(kept) == len(self.heap):
+            return False
+        heapq.heapify(kept)
+        self.heap = kept
+        return True
+
+    def complete(self, k: int) -> bool:
+        """Whether the K fastest kept entries are the K fastest there are."""
+        if self.floor is None:
+            return True
+        return sum(1 for it in self.heap if it[:3] > self.floor) >= k
+
+    def rows(self, k: int) -> List[List[Any]]:
+        return [[-it[0] / 1000, it[3], -it[1], it[4], it[5]] for it in sorted(self.heap, reverse=True)[:k]]
+
+def heat_items(doc: Dict[str, Any]) -> List[Tuple[List[str], Item]]:
+    """(bucket keys, heap item) for every timed driver entry of a heat."""
+    heat_no = doc.get("heat_no") or 0
+    heat_type = doc.get("heat_type")
+    start = doc.get("start_time_iso")
+    types = [OVERALL, type_slug(normalize_heat_type(heat_type))]
+    periods = [ALL_TIME] + ([start[:7]] if start else [])
+    keys = [f"{t}/{p}" for t in types for p in periods]
+    out = []
+    for i, d in enumerate(doc.get("drivers") or []):
+        name = (d.get("name") or "").strip()
+        t = fastest_lap(d)
+        if not name or t is None:
+            continue
+        out.append((keys, [-round(t * 1000), -heat_no, -i, name, heat_type, start]))
+    return out
+
+class Rankings:
+    def __init__(self, k: int, headroom: int, buckets: Optional[Dict[str, Bucket]] = None,
+                 labels: Optional[Dict[str, str]] = None):
+        self.k = k
+        self.headroom = headroom
+        self.buckets: Dict[str, Bucket] = buckets or {}
+        self.labels: Dict[str, str] = labels or {OVERALL: "Overall"}
+
+    def add_heat(self, doc: Dict[str, Any], only: Optional[Set[str]] = None) -> Set[str]:
+        """Push a heat's entries into its buckets (just those in `only`, if given); returns the keys touched."""
+        touched = set()
+        for keys, item in heat_items(doc):
+            for key in keys:
+                if only is not None and key not in only:
+                    continue
+                self.buckets.setdefault(key, Bucket()).push(item, self.k + self.headroom)
+                touched.add(key)
+        if doc.get("heat_type"):
+            self.labels.setdefault(type_slug(normalize_heat_type(doc["heat_type"])), normalize_heat_type(doc["heat_type"]))
+        return touched
+
+def _state_dir() -> str:
+    # "_" can't start a type slug, so this never clashes with an output directory
+    return os.path.join(config.RANKINGS_DIR, "_state")
+
+def _bucket_state_path(key: str) -> str:
+    slug, period = key.split("/")
+    return os.path.join(_state_dir(), slug, f"{period}.json")
+
+def _load() -> Optional[Rankings]:
+    try:
+        meta = storage.read_json(os.path.join(_state_dir(), "meta.json"))
+        if (meta["k"], meta["headroom"]) != (config.RANKING_TOP_K, config.RANKING_HEADROOM):
+            return None
+        buckets = {}
+        for key in meta["buckets"]:
+            b = storage.read_json(_bucket_state_path(key))
+            buckets[key] = Bucket([list(it) for it in b["heap"]], b["floor"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return Rankings(meta["k"], meta["headroom"], buckets, meta["labels"])
+
+def _save(ranks: Rankings, touched: Optional[Set[str]], removed: Iterable[str]):
+    """Heap state per bucket, so a run rewrites just the buckets it touched (plus the small meta.json)."""
+    for key in removed:
+        if os.path.exists(_bucket_state_path(key)):
+            os.remove(_bucket_state_path(key))
+    for key, b in ranks.buckets.items():
+        if touched is not None and key not in touched:
+            continue
+        os.makedirs(os.path.dirname(_bucket_state_path(key)), exist_ok=True)
+        storage.write_json(_bucket_state_path(key), {"floor": b.floor, "heap": b.heap})
+    storage.write_json(os.path.join(_state_dir(), "meta.json"), {
+        "k": ranks.k,
+        "headroom": ranks.headroom,
+        "labels": ranks.labels,
+        "buckets": sorted(ranks.buckets),
+    })
+
+def rebuild() -> Rankings:
+    """Stream every stored heat through fresh heaps and write all buckets."""
+    ranks = Rankings(config.RANKING_TOP_K, config.RANKING_HEADROOM)
+    for _, doc in storage.iter_heats():
+        ranks.add_heat(doc)
+    _write(ranks, None)
+    return ranks
+
+def update(changed: Iterable[int]) -> Rankings:
+    """
+    Apply heats added or re-scraped since the last run: their previous entries are
+    dropped from every bucket and the current ones pushed. Thanks to the headroom a
+    bucket that lost entries is normally still complete (see Bucket.floor);
+    only one that doesn't is refilled, by streaming storage for those buckets alone.
+    Without saved state (or after RANKING_TOP_K / RANKING_HEADROOM changed) this is rebuild().
+    """
+    ranks = _load()
+    if ranks is None:
+        return rebuild()
+    changed = set(changed)
+    if not changed:
+        return ranks
+    touched: Set[str] = set()
+    for key, b in ranks.buckets.items():
+        if b.drop_heats(changed):
+            touched.add(key)
+    for _, doc in storage.iter_heats(sorted(changed)):
+        touched |= ranks.add_heat(doc)
+    # an entry turned away earlier may now belong in the top K
+    short = {key for key in touched if not ranks.buckets[key].complete(ranks.k)}
+    if short:
+        for key in short:
+            ranks.buckets[key] = Bucket()
+        for _, doc in storage.iter_heats():
+            ranks.add_heat(doc, only=short)
+    _write(ranks, touched)
+    return ranks
+
+def _write(ranks: Rankings, touched: Optional[Set[str]]):
+    os.makedirs(_state_dir(), exist_ok=True)
+    if touched is None:
+        # full rebuild: start the state over, dropping buckets that no longer exist
+        shutil.rmtree(_state_dir())
+        os.makedirs(_state_dir())
+    removed = [key for key, b in ranks.buckets.items() if not b.heap]
+    for key in removed:
+        # a re-scraped heat moved to another type/month and took the bucket's last entries along
+        del ranks.buckets[key]
+        slug, period = key.split("/")
+        path = os.path.join(config.RANKINGS_DIR, slug, f"{period}.json")
+        if os.path.exists(path):
+            os.remove(path)
+    for key, b in ranks.buckets.items():
+        if touched is not None and key not in touched:
+            continue
+        slug, period = key.split("/")
+        os.makedirs(os.path.join(config.RANKINGS_DIR, slug), exist_ok=True)
+        storage.write_json(os.path.join(config.RANKINGS_DIR, slug, f"{period}.json"), {
+            "type": ranks.labels.get(slug, slug), "period": period, "columns": COLUMNS, "rows": b.rows(ranks.k),
+        })
+    types: Dict[str, List[str]] = {}
+    for key in sorted(ranks.buckets):
+        slug, period = key.split("/")
+        types.setdefault(slug, []).append(period)
+    storage.write_json(os.path.join(config.RANKINGS_DIR, "index.json"), {
+        "last_updated_utc": datetime.now(timezone.utc).isoformat(),
+        "k": ranks.k,
+        "types": [{"slug": s, "type": ranks.labels.get(s, s), "periods": p} for s, p in types.items()],
+    })
+    _save(ranks, touched, removed)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+import argparse
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from . import archive, clubspeed, parse, storage
+from .run import build_heat, update_driver_index
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Regenerate data/heats/*.json from the raw HTML archive")
+    p.add_argument("start", nargs="?", type=int, help="optional: first heat")
+    p.add_argument("end",   nargs="?", type=int, help="optional: last heat (inclusive)")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parser processes")
+    p.add_argument("--all", action="store_true",
+                   help="reparse every archived heat, not just stale ones (older parser_version or new HTML)")
+    p.add_argument("--dry-run", action="store_true", help="report what would change, write nothing")
+    p.add_argument("--check-engines", action="store_true",
+                   help="verify the lxml fast path matches the BeautifulSoup parser on the archive; write nothing")
+    return p.parse_args()
+
+def _carry_over_popup_laps(heat: Dict[str, Any], old: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # Fallback-layout heats get laps from per-driver popups, which are not archived;
+    # keep the laps already on disk for drivers whose popup we can't re-read.
+    if not old:
+        return heat
+    prev = {d.get("name"): d for d in old.get("drivers", [])}
+    for d in heat.get("drivers", []):
+        o = prev.get(d.get("name"))
+        if d.get("lap_times_url") and d.get("laps") is None and o:
+            d["laps"] = o.get("laps")
+            d["lap_positions"] = o.get("lap_positions")
+    return heat
+
+def is_current(doc: Optional[Dict[str, Any]], source_sha256: str) -> bool:
+    """True if `doc` came from this exact HTML through the current parser version."""
+    return bool(doc) and doc.get("parser_version", 0) >= parse.PARSER_VERSION \
+        and doc.get("source_sha256") == source_sha256
+
+def reparse_heat(heat_no: int, force: bool = False) -> Tuple[int, Optional[Dict[str, Any]]]:
+    """
+    Parse the newest archived snapshot of one heat (runs in a worker process).
+    Returns (heat_no, None) when there is no snapshot, or, unless `force`, when
+    the stored document is already current for it.
+    """
+    path = archive.latest(heat_no)
+    if not path:
+        return heat_no, None
+    html = archive.read(path)
+    stored = storage.read_heat(heat_no)
+    if not force and is_current(stored, archive.content_hash(html)):
+        return heat_no, None
+    heat = build_heat(heat_no, html, clubspeed.heat_details_url(heat_no), fetch_laps=False)
+    return heat_no, _carry_over_popup_laps(heat, stored)
+
+def compare_engines(heat_no: int) -> Tuple[int, str]:
+    """"same", "differ" or "fallback" (lxml declined the page) for the newest snapshot."""
+    path = archive.latest(heat_no)
+    if not path:
+        return heat_no, "fallback"
+    html = archive.read(path)
+    fast = parse.parse_heat_details_html(html, engine="lxml")
+    if fast is None:
+        return heat_no, "fallback"
+    return heat_no, "same" if fast == parse.parse_heat_details_html(html, engine="bs4") else "differ"
+
+def main():
+    args = parse_args()
+    heats: List[int] = archive.list_heats()
+    if args.start is not None:
+        end = args.end if args.end is not None else args.start
+        heats = [h for h in heats if args.start <= h <= end]
+
+    if args.check_engines:
+        counts: Dict[str, int] = {"same": 0, "differ": 0, "fallback": 0}
+        differ: List[int] = []
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            for heat_no, status in pool.map(compare_engines, heats, chunksize=16):
+                counts[status] += 1
+                if status == "differ":
+                    differ.append(heat_no)
+        print(f"Engine check over {len(heats)} heat(s): {counts}")
+        if differ:
+            print(f"lxml/bs4 mismatch in heats: {differ}")
+            raise SystemExit(1)
+        return
+
+    changed: List[int] = []
+    stale = 0
+    workers = max(1, args.workers)
+    chunk = max(1, len(heats) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for heat_no, heat in pool.map(functools.partial(reparse_heat, force=args.all), heats, chunksize=chunk):
+            if heat is None:
+                continue
+            stale += 1
+            if storage.same_heat(heat, storage.read_heat(heat_no)):
+                continue
+            changed.append(heat_no)
+            if not args.dry_run:
+                storage.write_heat(heat_no, heat)
+    storage.flush()
+
+    if changed and not args.dry_run:
+        update_driver_index(changed)
+    verb = "would change" if args.dry_run else "changed"
+    print(f"Checked {len(heats)} archived heat(s): reparsed {stale}, {len(changed)} {verb}.")
+
+if __name__ == "__main__":
+    main()
@@ -3,25 +3,67 @@ import sys
 import os
 import re
 import argparse
+import bisect
+import hashlib
+import heapq
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from urllib.parse import urljoin
-from typing import Dict, Any, List, Optional
-from . import config, clubspeed, parse, storage
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple
+from . import archive, config, clubspeed, lapstore, leaderboard, parse, pending, rankings, storage
+from .frontier import FrontierSearch
 
 def parse_args():
     p = argparse.ArgumentParser(description="PGP heat scraper")
     p.add_argument("start", nargs="?", type=int, help="optional: start heat")
     p.add_argument("end",   nargs="?", type=int, help="optional: end heat (inclusive)")
     p.add_argument("--max", type=int, default=None, help="max heats to process this run")
+    p.add_argument("--workers", type=int, default=config.SCRAPE_WORKERS,
+                   help="heats fetched/parsed concurrently (global request rate still capped)")
+    p.add_argument("--parse-workers", type=int, default=config.PARSE_WORKERS,
+                   help="parse pages in this many processes, fed by the fetch workers (0 = parse in the fetch threads)")
+    p.add_argument("--stream", action="store_true",
+                   help="parse HeatDetails pages while they download and stop reading once the lap table is complete")
+    p.add_argument("--archive", action="store_true",
+                   help="keep gzipped HeatDetails snapshots in data/raw/ for scraper.reparse (ARCHIVE_RAW_HTML)")
+    p.add_argument("--adaptive", action="store_true",
+                   help="tune in-flight requests (up to --workers) from observed latency and errors")
+    p.add_argument("--frontier", action="store_true",
+                   help="locate the newest heat by galloping/binary search, then scrape up to it")
+    p.add_argument("--reindex", action="store_true",
+                   help="rebuild driver_index.json from every stored heat instead of updating it")
+    p.add_argument("--index-workers", type=int, default=config.INDEX_WORKERS,
+                   help="processes for a full index rebuild (0 = one per CPU)")
+    p.add_argument("--no-pending", action="store_true",
+                   help="skip re-probing queued empty/in-progress heats this run")
+    p.add_argument("--seed-pending", action="store_true",
+                   help="one-shot: queue every stored heat that has no drivers or is still recent")
     return p.parse_args()
 
-def fetch_html(url: str) -> Optional[str]:
-    resp = clubspeed.get(url)
+class FetchFailed(Exception):
+    """One URL kept failing (5xx/429/network) while the host as a whole stayed healthy."""
+
+def get_page(url: str, immutable: bool = False, stream: bool = False):
+    """clubspeed.get() that raises FetchFailed instead of handing back a response that never stopped failing."""
+    try:
+        resp = clubspeed.get(url, immutable=immutable, stream=stream)
+    except clubspeed.RequestFailed as exc:
+        raise FetchFailed(str(exc)) from exc
+    if resp.status_code in config.RETRYABLE_STATUS:
+        resp.close()
+        raise FetchFailed(f"{url}: HTTP {resp.status_code}")
+    return resp
+
+def fetch_html(url: str, immutable: bool = False) -> Optional[str]:
+    """Page text, or None on a miss (404, other errors, empty/login page). Raises FetchFailed, see get_page()."""
+    resp = get_page(url, immutable=immutable)
     if resp.status_code == 404:
         return None
     if resp.status_code >= 400:
         # treat other errors as a miss this round
         return None
-    clubspeed.polite_sleep()
     text = resp.text or ""
     # crude guard: if page is extremely short or login page, call it None
     if len(text) < 400 and "Heat" not in text:
@@ -34,44 +76,326 @@ def normalize_url(href: str) -> str:
     # Combine against base site
     return urljoin(config.SITE_BASE_URL, href)
 
-def fetch_driver_laps_if_linked(driver: Dict[str, Any]) -> Dict[str, Any]:
-    href = driver.get("lap_times_url")
-    if not href:
-        return driver
-    url = normalize_url(href)
-    html = fetch_html(url)
+def fetch_popup_laps(hrefs: Iterable[str], immutable: bool = False) -> Dict[str, Tuple[List[float], Optional[List[int]]]]:
+    """
+    Fetch and parse LapTimes popups concurrently, each distinct URL once.
+    Returns {href: (times, positions)} for the popups that loaded; a popup that
+    keeps failing is left out (its driver gets no laps, see pending.needs_recheck).
+    """
+    urls = {href: normalize_url(href) for href in hrefs}
+    unique = sorted(set(urls.values()))
+    if not unique:
+        return {}
+
+    def load(url: str):
+        try:
+            html = fetch_html(url, immutable=immutable)
+        except FetchFailed as exc:
+            print(f"LapTimes popup skipped: {exc}")
+            return None
+        return parse.parse_laptimes_popup(html) if html else None
+
+    workers = max(1, min(len(unique), config.POPUP_FETCH_WORKERS))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="popup") as pool:
+        parsed = dict(zip(unique, pool.map(load, unique)))
+    return {href: parsed[url] for href, url in urls.items() if parsed[url] is not None}
+
+def fetch_driver_laps(drivers: List[Dict[str, Any]], immutable: bool = False) -> List[Dict[str, Any]]:
+    """Fill laps/lap_positions for drivers whose row links a LapTimes popup."""
+    laps = fetch_popup_laps((d["lap_times_url"] for d in drivers if d.get("lap_times_url")), immutable)
+    for d in drivers:
+        got = laps.get(d.get("lap_times_url"))
+        if got is None:
+            continue
+        times, positions = got
+        d["laps"] = list(times) if times else None
+        d["lap_positions"] = list(positions) if positions else positions
+    return drivers
+
+def fetch_heat_page(heat_no: int) -> Optional[Tuple[str, str, bool]]:
+    """Fetch (and archive) one HeatDetails page: (url, html, immutable), or None on a miss."""
+    url = clubspeed.heat_details_url(heat_no)
+    # a heat we already hold that ran long ago can be served straight from the HTTP cache
+    stored = storage.read_heat(heat_no)
+    immutable = bool(stored) and clubspeed.heat_is_immutable(stored.get("start_time_iso"))
+    html = fetch_html(url, immutable=immutable)
     if not html:
-        return driver
-    times, positions = parse.parse_laptimes_popup(html)
-    driver["laps"] = times if times else None
-    driver["lap_positions"] = positions
-    return driver
+        return None
+    if config.ARCHIVE_RAW_HTML:
+        archive.save(heat_no, html)
+    return url, html, immutable
 
 def scrape_heat(heat_no: int) -> Optional[Dict[str, Any]]:
+    page = fetch_heat_page(heat_no)
+    if page is None:
+        return None
+    url, html, immutable = page
+    return build_heat(heat_no, html, url, immutable=immutable)
+
+def scrape_heat_streaming(heat_no: int) -> Optional[Dict[str, Any]]:
+    """
+    scrape_heat() that parses the HeatDetails body chunk by chunk and stops downloading
+    once parse.StreamingHeatParser has what it needs. The archived snapshot (and
+    source_sha256) is the part of the page that was read. Pages the streaming parser
+    can't handle are read to the end and go through parse_heat_details_html().
+    """
     url = clubspeed.heat_details_url(heat_no)
-    html = fetch_html(url)
-    if not html:
+    stored = storage.read_heat(heat_no)
+    immutable = bool(stored) and clubspeed.heat_is_immutable(stored.get("start_time_iso"))
+    resp = get_page(url, immutable=immutable, stream=True)
+    try:
+        if resp.status_code >= 400:
+            return None
+        encoding = resp.encoding or "utf-8"
+        streamer = parse.StreamingHeatParser(expected_heat_no=heat_no, encoding=encoding)
+        chunks: List[bytes] = []
+        body = resp.iter_content(config.STREAM_CHUNK_BYTES)
+        for chunk in body:
+            chunks.append(chunk)
+            if streamer.feed(chunk):
+                break
+        heat = streamer.result() if streamer.done else None
+        if heat is None:
+            chunks.extend(body)
+    finally:
+        resp.close()
+    html = b"".join(chunks).decode(encoding, errors="replace")
+    # same crude guard as fetch_html
+    if len(html) < 400 and "Heat" not in html:
         return None
-    heat = parse.parse_heat_details_html(html)
+    if config.ARCHIVE_RAW_HTML:
+        archive.save(heat_no, html)
+    if heat is None:
+        heat = parse.parse_heat_details_html(html, expected_heat_no=heat_no)
+    return finish_heat(heat_no, heat, url, archive.content_hash(html), immutable=immutable)
+
+def build_heat(heat_no: int, html: str, url: str, fetch_laps: bool = True,
+               immutable: bool = False) -> Dict[str, Any]:
+    """Parse a HeatDetails page into the stored heat document (popup laps fetched if `fetch_laps`)."""
+    heat = parse.parse_heat_details_html(html, expected_heat_no=heat_no)
+    return finish_heat(heat_no, heat, url, archive.content_hash(html), fetch_laps=fetch_laps, immutable=immutable)
+
+def finish_heat(heat_no: int, heat: Dict[str, Any], url: str, source_sha256: str,
+                fetch_laps: bool = True, immutable: bool = False) -> Dict[str, Any]:
+    """
+    Turn parser output into the stored heat document: heat_no, exclusions, popup laps,
+    source_url, plus the parser version and the sha256 of the HTML it came from.
+    """
     if not heat.get("heat_no"):
         # If we couldn't parse the number, inject it
         heat["heat_no"] = heat_no
+    stamp = {"parser_version": parse.PARSER_VERSION, "source_sha256": source_sha256}
     # filter by heat type if configured
     ht = (heat.get("heat_type") or "").strip()
     if config.EXCLUDE_HEAT_TYPES and any(ht.lower() == x.lower() for x in config.EXCLUDE_HEAT_TYPES):
         return {
             **heat,
-            "skipped_reason": f"excluded heat type: {ht}"
+            "skipped_reason": f"excluded heat type: {ht}",
+            **stamp,
         }
     # fetch laps per driver when links exist
-    enriched_drivers = []
-    for d in heat.get("drivers", []):
-        enriched_drivers.append(fetch_driver_laps_if_linked(d))
-    heat["drivers"] = enriched_drivers
+    if fetch_laps:
+        heat["drivers"] = fetch_driver_laps(heat.get("drivers", []), immutable=immutable)
     heat["source_url"] = url
+    heat.update(stamp)
     return heat
 
-def rebuild_driver_index() -> Dict[str, Any]:
+def spawn_pool(workers: int):
+    """
+    ProcessPoolExecutor whose workers are spawned, not forked: pools are started while
+    fetch and HTTP threads may be running, and a forked child would inherit their locks
+    in whatever state they happened to be.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+def _parse_job(html: str, heat_no: int) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """Process-pool side of the pipeline: parse, and hand back the fallback counts it added."""
+    before = parse.fallback_counts()
+    heat = parse.parse_heat_details_html(html, expected_heat_no=heat_no)
+    after = parse.fallback_counts()
+    return heat, {k: v - before.get(k, 0) for k, v in after.items() if v != before.get(k, 0)}
+
+class ParsePipeline:
+    """
+    Fetch threads hand raw HTML to a ProcessPoolExecutor running the parser and go
+    straight back to fetching: scrape() returns a Future of the finished heat, which
+    iter_scraped() resolves in heat order. At most `parse_workers * 2` pages wait for
+    or sit in the parse stage; a fetcher with another page blocks until one frees up
+    (backpressure). Parsed heats are finished (popup laps, stamps) on a thread pool
+    of the same size. Use `scrape` wherever scrape_heat would be used; close() when done.
+    """
+
+    def __init__(self, parse_workers: int):
+        self.parse_workers = max(1, parse_workers)
+        self._pool = spawn_pool(self.parse_workers)
+        self._finish = ThreadPoolExecutor(max_workers=self.parse_workers, thread_name_prefix="finish")
+        self._slots = threading.BoundedSemaphore(self.parse_workers * 2)
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._finish.shutdown(wait=True, cancel_futures=True)
+
+    def scrape(self, heat_no: int) -> Optional[Future]:
+        page = fetch_heat_page(heat_no)
+        if page is None:
+            return None
+        url, html, immutable = page
+        self._slots.acquire()
+        try:
+            parsed = self._pool.submit(_parse_job, html, heat_no)
+        except BaseException:
+            self._slots.release()
+            raise
+        done: Future = Future()
+
+        def finish():
+            try:
+                heat, fallbacks = parsed.result()
+                parse.add_fallback_counts(fallbacks)
+                done.set_result(finish_heat(heat_no, heat, url, archive.content_hash(html), immutable=immutable))
+            except BaseException as exc:
+                done.set_exception(exc)
+
+        def parsed_cb(_):
+            self._slots.release()
+            try:
+                self._finish.submit(finish)
+            except RuntimeError as exc:  # closed while this page was parsing
+                done.set_exception(exc)
+
+        parsed.add_done_callback(parsed_cb)
+        return done
+
+def resolved(heat):
+    """A scrape result, waited for if it came back as a Future (ParsePipeline.scrape)."""
+    return heat.result() if isinstance(heat, Future) else heat
+
+def iter_scraped(heat_nos: Iterable[int], workers: int = 1,
+                 scrape: Callable[[int], Optional[Dict[str, Any]]] = None) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """
+    Yield (heat_no, scrape_heat(heat_no)) strictly in the order of `heat_nos`.
+
+    With workers > 1 a small window of heats is scraped ahead on a thread pool;
+    results are still handed back in heat order so callers can commit them
+    sequentially. Closing the generator cancels anything not yet started.
+    """
+    scrape = scrape or scrape_heat
+    if workers <= 1:
+        for h in heat_nos:
+            yield h, resolved(scrape(h))
+        return
+
+    window = workers * 2
+    pending: deque = deque()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="heat")
+    try:
+        it = iter(heat_nos)
+        for h in itertools.islice(it, window):
+            pending.append((h, pool.submit(scrape, h)))
+        while pending:
+            h, fut = pending.popleft()
+            heat = resolved(fut.result())
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append((nxt, pool.submit(scrape, nxt)))
+            yield h, heat
+    finally:
+        for _, fut in pending:
+            fut.cancel()
+        pool.shutdown(wait=True)
+
+def recheck_pending(queue: Dict[str, Dict[str, Any]], workers: int = 1,
+                    changed: Optional[List[int]] = None,
+                    scrape: Callable[[int], Optional[Dict[str, Any]]] = None) -> List[int]:
+    """Re-scrape due heats from the pending queue; returns (and appends to `changed`) the heats rewritten."""
+    from datetime import datetime, timezone
+    now = datetime.now(timezone.utc)
+    due = pending.due(queue, now, config.PENDING_MAX_PER_RUN)
+    changed = changed if changed is not None else []
+    rewritten = 0
+    for heat_no, heat in iter_scraped(due, workers, scrape=scrape):
+        if pending.record(queue, heat_no, heat, now):
+            changed.append(heat_no)
+            rewritten += 1
+    if due:
+        print(f"Re-probed {len(due)} pending heat(s), {rewritten} changed, {len(queue)} still queued.")
+    return changed
+
+def _index_entries(doc: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(driver name, driver_index entry) for every named driver in a heat document."""
+    for d in doc.get("drivers", []):
+        name = (d.get("name") or "").strip()
+        if not name:
+            continue
+        yield name, {
+            "heat_no": doc.get("heat_no"),
+            "heat_type": doc.get("heat_type"),
+            "position": d.get("position"),
+            "kart": d.get("kart"),
+            "best_lap_seconds": d.get("best_lap_seconds"),
+            "laps": d.get("laps"),
+            "start_time_iso": doc.get("start_time_iso"),
+        }
+
+def _index_sort_key(ent: Dict[str, Any]) -> Tuple[str, int]:
+    return (ent["start_time_iso"] or "", ent["heat_no"] or 0)
+
+def driver_slug(name: str) -> str:
+    """Stable shard file name for a driver: readable prefix plus a hash of the exact name."""
+    base = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")[:40] or "driver"
+    return f"{base}-{hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]}"
+
+def _write_driver_shards(drivers: Dict[str, List[Dict[str, Any]]], updated: str,
+                         touched: Optional[Iterable[str]] = None):
+    """
+    The sharded twin of driver_index.json: DRIVER_SHARDS_DIR/<slug>.json per driver
+    ({"name", "entries"}) and a directory file mapping names to shards, so pages
+    fetch only the drivers they show. With `touched`, only those drivers' shards are
+    rewritten (or removed); otherwise all of them, dropping shards of vanished drivers.
+    """
+    os.makedirs(config.DRIVER_SHARDS_DIR, exist_ok=True)
+    if touched is None or not os.path.exists(config.DRIVER_DIRECTORY_FILE):
+        names = set(drivers)
+        keep = {driver_slug(n) + ".json" for n in names}
+        for fn in os.listdir(config.DRIVER_SHARDS_DIR):
+            if fn.endswith(".json") and fn not in keep and fn != os.path.basename(config.DRIVER_DIRECTORY_FILE):
+                os.remove(os.path.join(config.DRIVER_SHARDS_DIR, fn))
+    else:
+        names = set(touched)
+    for name in names:
+        path = os.path.join(config.DRIVER_SHARDS_DIR, driver_slug(name) + ".json")
+        if name in drivers:
+            storage.write_json(path, {"name": name, "entries": drivers[name]})
+        elif os.path.exists(path):
+            os.remove(path)
+    storage.write_json(config.DRIVER_DIRECTORY_FILE, {
+        "last_updated_utc": updated,
+        "drivers": {name: {"shard": driver_slug(name), "heats": len(drivers[name])} for name in sorted(drivers)},
+    })
+
+def _write_index(drivers: Dict[str, List[Dict[str, Any]]], heat_nos: List[int],
+                 touched: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    from datetime import datetime, timezone
+    driver_index = {
+        "last_updated_utc": datetime.now(timezone.utc).isoformat(),
+        "drivers": drivers,
+    }
+    storage.write_json(config.DRIVER_INDEX_FILE, driver_index)
+    _write_driver_shards(drivers, driver_index["last_updated_utc"], touched)
+    leaderboard.update(drivers, touched)
+    # simple top-level summary
+    rollup = {
+        "last_updated_utc": driver_index["last_updated_utc"],
+        "heats_count": len(heat_nos),
+        "max_heat_no": max(heat_nos) if heat_nos else None,
+        "source": config.SITE_BASE_URL,
+    }
+    storage.write_json(config.SUMMARY_FILE, rollup)
+    return driver_index
+
+def rebuild_driver_index(workers: Optional[int] = None) -> Dict[str, Any]:
     """
     Scan all heats JSON and build a cross-heat view:
     {
@@ -84,83 +408,193 @@ def rebuild_driver_index() -> Dict[str, Any]:
       }
     }
     """
-    from datetime import datetime, timezone
-    summary: Dict[str, List[Dict[str, Any]]] = {}
     heat_nos = storage.list_heat_files()
-    for h in heat_nos:
-        with open(storage.heat_path(h), "r", encoding="utf-8") as f:
-            doc = json.load(f)
-        for d in doc.get("drivers", []):
-            name = (d.get("name") or "").strip()
-            if not name:
-                continue
-            ent = {
-                "heat_no": doc.get("heat_no"),
-                "heat_type": doc.get("heat_type"),
-                "position": d.get("position"),
-                "kart": d.get("kart"),
-                "best_lap_seconds": d.get("best_lap_seconds"),
-                "laps": d.get("laps"),
-                "start_time_iso": doc.get("start_time_iso"),
-            }
+    index = _write_index(build_driver_index_parallel(heat_nos, workers), heat_nos)
+    rankings.rebuild()
+    return index
+
+def build_driver_index(heat_nos: Iterable[int]) -> Dict[str, List[Dict[str, Any]]]:
+    """The "drivers" mapping of driver_index.json for the given stored heats (no writes)."""
+    summary: Dict[str, List[Dict[str, Any]]] = {}
+    for _, doc in storage.iter_heats(heat_nos):
+        for name, ent in _index_entries(doc):
             summary.setdefault(name, []).append(ent)
     # sort each driver's entries by heat number
     for name, arr in summary.items():
-        arr.sort(key=lambda x: (x["start_time_iso"] or "", x["heat_no"] or 0, ))
-    driver_index = {
-        "last_updated_utc": datetime.now(timezone.utc).isoformat(),
-        "drivers": summary,
-    }
-    storage.write_json(config.DRIVER_INDEX_FILE, driver_index)
-    # simple top-level summary
-    rollup = {
-        "last_updated_utc": driver_index["last_updated_utc"],
-        "heats_count": len(heat_nos),
-        "max_heat_no": max(heat_nos) if heat_nos else None,
-        "source": config.SITE_BASE_URL,
+        arr.sort(key=_index_sort_key)
+    return summary
+
+def build_driver_index_parallel(heat_nos: Iterable[int], workers: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    build_driver_index() across a process pool: contiguous chunks of at least
+    INDEX_CHUNK_HEATS heats are loaded and projected in `workers` processes
+    (INDEX_WORKERS, 0 = one per CPU), then each driver's sorted partial lists are
+    k-way merged. Same result as build_driver_index(), including tie order, since
+    chunks are merged in heat order.
+    """
+    heat_nos = list(heat_nos)
+    workers = workers or config.INDEX_WORKERS or os.cpu_count() or 1
+    chunk = max(config.INDEX_CHUNK_HEATS, -(-len(heat_nos) // workers))
+    chunks = [heat_nos[i:i + chunk] for i in range(0, len(heat_nos), chunk)]
+    if workers <= 1 or len(chunks) <= 1:
+        return build_driver_index(heat_nos)
+    with spawn_pool(min(workers, len(chunks))) as pool:
+        parts = list(pool.map(build_driver_index, chunks))
+    runs: Dict[str, List[List[Dict[str, Any]]]] = {}
+    for part in parts:
+        for name, entries in part.items():
+            runs.setdefault(name, []).append(entries)
+    return {
+        name: lists[0] if len(lists) == 1 else list(heapq.merge(*lists, key=_index_sort_key))
+        for name, lists in runs.items()
     }
-    storage.write_json(config.SUMMARY_FILE, rollup)
-    return driver_index
 
-import json
+def update_driver_index(changed: Iterable[int]) -> Dict[str, Any]:
+    """
+    Apply only the heats written this run to the existing driver_index.json:
+    their old entries are dropped and the current ones inserted in sort order.
+    Falls back to rebuild_driver_index() when there is no usable index yet.
+    """
+    try:
+        drivers = storage.read_json(config.DRIVER_INDEX_FILE)["drivers"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return rebuild_driver_index()
+
+    changed = set(changed)
+    touched = set()
+    if changed:
+        for name in list(drivers):
+            kept = [e for e in drivers[name] if e.get("heat_no") not in changed]
+            if len(kept) != len(drivers[name]):
+                touched.add(name)
+                if kept:
+                    drivers[name] = kept
+                else:
+                    del drivers[name]
+        for h in sorted(changed):
+            doc = storage.read_heat(h)
+            if doc is None:
+                continue
+            for name, ent in _index_entries(doc):
+                touched.add(name)
+                bisect.insort(drivers.setdefault(name, []), ent, key=_index_sort_key)
+    index = _write_index(drivers, storage.list_heat_files(), touched)
+    rankings.update(changed)
+    return index
 
 def main():
     storage.ensure_dirs()
     args = parse_args()
+    if args.archive:
+        config.ARCHIVE_RAW_HTML = True
+    workers = max(1, args.workers or 1)
+    clubspeed.configure_pool(workers, adaptive=args.adaptive, fan_out=config.POPUP_FETCH_WORKERS)
+    pipeline = ParsePipeline(args.parse_workers) if args.parse_workers > 0 and not args.stream else None
+    if pipeline:
+        scrape_page = pipeline.scrape
+    else:
+        scrape_page = scrape_heat_streaming if args.stream else scrape_heat
+    failed: List[int] = []
+
+    def scrape(heat_no: int) -> Optional[Dict[str, Any]]:
+        # a heat whose page keeps failing is a miss this run and gets re-probed from the queue
+        try:
+            return scrape_page(heat_no)
+        except FetchFailed as exc:
+            print(f"Heat {heat_no} skipped: {exc}")
+            failed.append(heat_no)
+            return None
 
     last = storage.read_last_heat()
     start = last + 1 if isinstance(last, int) else config.START_HEAT_NO
 
     # CLI bounding (optional)
+    search = None
     if args.start is not None:
         cur = args.start
         end = args.end if args.end is not None else args.start
+    elif args.frontier:
+        search = FrontierSearch(scrape)
+        known = max(x for x in (last, storage.read_frontier(), start - 1) if isinstance(x, int))
+        try:
+            end = search.find(known)
+        except clubspeed.HostUnavailable as exc:
+            print(f"Frontier search aborted, host degraded: {exc}")
+            end = start - 1
+        else:
+            storage.write_frontier(end)
+            print(f"Frontier: heat {end} ({search.probes} probe(s)).")
+        cur = start
     else:
         cur = start
         end = None
 
+    heat_nos = range(cur, end + 1) if end is not None else itertools.count(cur)
+    if args.max is not None and args.max <= 0:
+        heat_nos = range(0)
+
+    from datetime import datetime, timezone
+    queue = pending.load()
+    if args.seed_pending:
+        print(f"Queued {pending.seed_from_storage(queue, datetime.now(timezone.utc))} stored heat(s) for re-probe.")
+
     consecutive_misses = 0
     processed = 0
+    changed: List[int] = []
 
-    while True:
-        if end is not None and cur > end:
-            break
-        if args.max is not None and processed >= args.max:
-            break
+    results = iter_scraped(heat_nos, workers, scrape=search.scrape if search else scrape)
+    try:
+        for heat_no, heat in results:
+            if heat is None:
+                consecutive_misses += 1
+                # below a known frontier a miss is a numbering gap, not the end
+                if search is None and consecutive_misses >= config.MAX_CONSECUTIVE_MISSES:
+                    break
+            else:
+                consecutive_misses = 0
+                storage.write_heat(heat_no, heat)
+                storage.write_last_heat(heat_no)
+                changed.append(heat_no)
+                pending.enqueue(queue, heat_no, heat, datetime.now(timezone.utc))
+                processed += 1
+                if args.max is not None and processed >= args.max:
+                    break
+    except clubspeed.HostUnavailable as exc:
+        # leave last_heat where it is; the next run picks up from here
+        print(f"Stopping early, host degraded: {exc}")
+    finally:
+        results.close()
 
-        heat = scrape_heat(cur)
-        if heat is None:
-            consecutive_misses += 1
-            if consecutive_misses >= config.MAX_CONSECUTIVE_MISSES:
-                break
-        else:
-            consecutive_misses = 0
-            storage.write_heat(cur, heat)
-            storage.write_last_heat(cur)
-            processed += 1
-        cur += 1
+    for heat_no in failed:
+        pending.enqueue_failed(queue, heat_no, datetime.now(timezone.utc))
+    if not args.no_pending:
+        try:
+            recheck_pending(queue, workers, changed, scrape=scrape)
+        except clubspeed.HostUnavailable as exc:
+            print(f"Pending re-probe stopped, host degraded: {exc}")
+    pending.save(queue)
+    storage.flush()
+    if clubspeed.cache:
+        removed, freed = clubspeed.cache.prune()
+        if removed:
+            print(f"HTTP cache: pruned {removed} entr{'y' if removed == 1 else 'ies'} ({freed / 1e6:.1f} MB).")
+    if pipeline:
+        pipeline.close()
 
-    rebuild_driver_index()
+    if args.reindex:
+        rebuild_driver_index(args.index_workers)
+    else:
+        update_driver_index(changed)
+    if config.LAP_STORE_ENABLED and args.reindex:
+        if lapstore.available():
+            lapstore.build()
+        else:
+            print("Lap store skipped: LAP_STORE_ENABLED needs numpy (pip install numpy).")
+    if parse.fallback_counts():
+        print(f"Parser fallbacks: {parse.fallback_counts()}")
+    if clubspeed.concurrency:
+        c = clubspeed.concurrency
+        print(f"Adaptive concurrency: final limit {c.limit}/{c.maximum} after {len(c.decisions)} adjustment(s).")
     print(f"Done. Processed {processed} heat(s). Last heat: {storage.read_last_heat()}.")
 
 if __name__ == "__main__":
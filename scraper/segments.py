@@ -0,0 +1,236 @@
+from __future__ import annotations
+import argparse
+import atexit
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from . import config, storage
+
+_RE_SEGMENT = re.compile(r"^seg-(\d+)\.jsonl$")
+
+class SegmentLog:
+    """
+    Heats as an append-only log: one compact JSON document per line in rolling
+    segment files (seg-000001.jsonl, ...), each at most `max_bytes` before the next
+    is started. index.json maps heat_no -> [segment, offset, length] of the newest
+    record, so reads are one seek. A re-scraped heat is simply appended again; the
+    older record stays behind as garbage until compact().
+
+    The index is saved every `batch_size` appends and on flush(). Records appended
+    after the last save are recovered on open by scanning the segment tails. There
+    must be a single writer: don't run --compact while a scrape is writing.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 4 << 20, batch_size: int = 200):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.batch_size = max(1, batch_size)
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self._out = None
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    # ---------- index ----------
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, "index.json")
+
+    def segment_path(self, seg: int) -> str:
+        return os.path.join(self.directory, f"seg-{seg:06d}.jsonl")
+
+    def _segments_on_disk(self) -> List[int]:
+        return sorted(int(m.group(1)) for m in map(_RE_SEGMENT.match, os.listdir(self.directory)) if m)
+
+    def _load_index(self):
+        try:
+            saved = storage.read_json(self.index_path)
+            self.heats: Dict[int, Tuple[int, int, int]] = {int(k): tuple(v) for k, v in saved["heats"].items()}
+            self.sizes: Dict[int, int] = {int(k): v for k, v in saved["sizes"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            self.heats, self.sizes = {}, {}
+        for seg in self._segments_on_disk():
+            actual = os.path.getsize(self.segment_path(seg))
+            if actual > self.sizes.get(seg, 0):
+                end = self._scan_tail(seg, self.sizes.get(seg, 0))
+                if end < actual:
+                    # a write cut short by a crash; drop it so the next record starts on a fresh line
+                    os.truncate(self.segment_path(seg), end)
+                    actual = end
+                self._dirty += 1
+            self.sizes[seg] = actual
+
+    def _scan_tail(self, seg: int, start: int) -> int:
+        """Index the records of `seg` from byte `start` on; returns the end of the last complete line."""
+        with open(self.segment_path(seg), "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    heat_no = storage.loads(line).get("heat_no")
+                except ValueError:
+                    heat_no = None
+                if isinstance(heat_no, int):
+                    self.heats[heat_no] = (seg, offset, len(line))
+                offset += len(line)
+        return offset
+
+    def _save_index(self):
+        storage.write_json(self.index_path, {
+            "sizes": {str(k): v for k, v in sorted(self.sizes.items())},
+            "heats": {str(k): list(v) for k, v in sorted(self.heats.items())},
+        })
+        self._dirty = 0
+
+    # ---------- reads / writes ----------
+
+    def locate(self, heat_no: int) -> Optional[Tuple[str, int, int]]:
+        """(segment file, byte offset, length) of a heat's current record."""
+        with self._lock:
+            loc = self.heats.get(heat_no)
+        return (self.segment_path(loc[0]), loc[1], loc[2]) if loc else None
+
+    def read_heat(self, heat_no: int) -> Optional[Dict[str, Any]]:
+        loc = self.locate(heat_no)
+        if loc is None:
+            return None
+        path, offset, length = loc
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return storage.loads(f.read(length))
+
+    def heat_nos(self) -> List[int]:
+        with self._lock:
+            return sorted(self.heats)
+
+    def write_heat(self, heat_no: int, doc: Dict[str, Any]):
+        """Append `doc` (compact form) as the heat's current record."""
+        line = storage.dumps_min(doc) + b"\n"
+        with self._lock:
+            seg = max(self.sizes) if self.sizes else 1
+            if self.sizes.get(seg, 0) and self.sizes[seg] + len(line) > self.max_bytes:
+                seg += 1
+            if self._out is None or self._out[0] != seg:
+                self._close_out()
+                self._out = (seg, open(self.segment_path(seg), "ab"))
+            offset = self.sizes.get(seg, 0)
+            f = self._out[1]
+            f.write(line)
+            f.flush()
+            self.sizes[seg] = offset + len(line)
+            self.heats[heat_no] = (seg, offset, len(line))
+            self._dirty += 1
+            if self._dirty >= self.batch_size:
+                self._save_index()
+
+    def _close_out(self):
+        if self._out is not None:
+            self._out[1].close()
+            self._out = None
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def scan(self, heat_nos: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        (heat_no, doc) for the current record of each heat (of `heat_nos`, if given), reading
+        the segments front to back instead of seeking per heat. Superseded records are skipped.
+        """
+        with self._lock:
+            wanted = dict(self.heats)
+        if heat_nos is not None:
+            keep = set(heat_nos)
+            wanted = {h: loc for h, loc in wanted.items() if h in keep}
+        by_seg: Dict[int, List[Tuple[int, int, int]]] = {}
+        for h, (seg, offset, length) in wanted.items():
+            by_seg.setdefault(seg, []).append((offset, length, h))
+        loads = storage.loads
+        for seg in sorted(by_seg):
+            with open(self.segment_path(seg), "rb") as f:
+                data = f.read()
+            for offset, length, h in sorted(by_seg[seg]):
+                yield h, loads(data[offset:offset + length])
+
+    def garbage_bytes(self) -> int:
+        with self._lock:
+            return sum(self.sizes.values()) - sum(length for _, _, length in self.heats.values())
+
+    def compact(self) -> Tuple[int, int]:
+        """
+        Rewrite the live records, in heat order, into fresh segments and delete the old
+        ones. Returns (bytes before, bytes after).
+        """
+        with self._lock:
+            self._close_out()
+            before = sum(self.sizes.values())
+            old_segs = self._segments_on_disk()
+            first = (max(old_segs) if old_segs else 0) + 1
+            heats, sizes = {}, {}
+            seg, out = first, None
+            for h in sorted(self.heats):
+                src, offset, length = self.heats[h]
+                with open(self.segment_path(src), "rb") as f:
+                    f.seek(offset)
+                    line = f.read(length)
+                if out is not None and sizes[seg] + length > self.max_bytes:
+                    out.close()
+                    out, seg = None, seg + 1
+                if out is None:
+                    out = open(self.segment_path(seg), "wb")
+                    sizes[seg] = 0
+                out.write(line)
+                heats[h] = (seg, sizes[seg], length)
+                sizes[seg] += length
+            if out is not None:
+                out.close()
+            self.heats, self.sizes = heats, sizes
+            self._save_index()
+            for s in old_segs:
+                os.remove(self.segment_path(s))
+            return before, sum(sizes.values())
+
+_logs: Dict[int, SegmentLog] = {}
+_logs_lock = threading.Lock()
+
+def log() -> SegmentLog:
+    """This process's SegmentLog on config.SEGMENTS_DIR."""
+    pid = os.getpid()
+    with _logs_lock:
+        if pid not in _logs:
+            _logs[pid] = SegmentLog(config.SEGMENTS_DIR, config.SEGMENT_MAX_BYTES, config.SEGMENT_INDEX_BATCH)
+            atexit.register(_logs[pid].flush)
+        return _logs[pid]
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Maintain the append-only heat segment log")
+    p.add_argument("--import", dest="import_json", action="store_true",
+                   help="append every data/heats/*.json file to the log")
+    p.add_argument("--compact", action="store_true", help="drop superseded records from the log")
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    seglog = SegmentLog(config.SEGMENTS_DIR, config.SEGMENT_MAX_BYTES, config.SEGMENT_INDEX_BATCH)
+    if args.import_json:
+        started = time.monotonic()
+        heats = storage.list_json_heats()
+        for h in heats:
+            seglog.write_heat(h, storage.compact_heat(storage.read_heat_file(h)))
+        seglog.flush()
+        print(f"Appended {len(heats)} heat(s) to {config.SEGMENTS_DIR} in {time.monotonic() - started:.1f}s.")
+    if args.compact:
+        before, after = seglog.compact()
+        print(f"Compacted {len(seglog.heats)} heat(s): {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB.")
+    if not (args.import_json or args.compact):
+        print(f"{len(seglog.heats)} heat(s) in {len(seglog.sizes)} segment(s), "
+              f"{seglog.garbage_bytes() / 1e6:.1f} MB superseded.")
+
+if __name__ == "__main__":
+    main()
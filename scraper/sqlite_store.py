@@ -0,0 +1,145 @@
+from __future__ import annotations
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from . import config
+
+# heats keeps the compact document (storage.compact_heat) as the source of truth for
+# read_heat(); driver_entries and laps are its normalized, indexed projection for queries.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS heats (
+    heat_no        INTEGER PRIMARY KEY,
+    heat_type      TEXT,
+    start_time_iso TEXT,
+    source_url     TEXT,
+    skipped_reason TEXT,
+    parser_version INTEGER,
+    source_sha256  TEXT,
+    doc            TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS driver_entries (
+    heat_no       INTEGER NOT NULL,
+    entry_no      INTEGER NOT NULL,
+    name          TEXT,
+    position      INTEGER,
+    kart          TEXT,
+    best_lap_ms   INTEGER,
+    lap_count     INTEGER,
+    lap_times_url TEXT,
+    PRIMARY KEY (heat_no, entry_no)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS laps (
+    heat_no  INTEGER NOT NULL,
+    entry_no INTEGER NOT NULL,
+    lap_no   INTEGER NOT NULL,
+    lap_ms   INTEGER,
+    position INTEGER,
+    PRIMARY KEY (heat_no, entry_no, lap_no)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_heats_type ON heats (heat_type);
+CREATE INDEX IF NOT EXISTS idx_heats_start ON heats (start_time_iso);
+CREATE INDEX IF NOT EXISTS idx_entries_name ON driver_entries (name, best_lap_ms);
+CREATE INDEX IF NOT EXISTS idx_entries_best ON driver_entries (best_lap_ms);
+"""
+
+class HeatDB:
+    """
+    One connection to the heats database (WAL, so readers in other processes don't
+    block the writer). Writes are committed every `batch_size` heats and on flush();
+    a lock makes the connection safe to share between the scraper's threads.
+    """
+
+    def __init__(self, path: str, batch_size: int = 200):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def write_heat(self, heat_no: int, doc: Dict[str, Any]):
+        """Insert or replace one heat; `doc` is in the compact form (laps_ms, best_lap_ms)."""
+        entries: List[Tuple] = []
+        laps: List[Tuple] = []
+        for i, d in enumerate(doc.get("drivers") or []):
+            times = d.get("laps_ms")
+            positions = d.get("lap_positions") or []
+            kart = d.get("kart")
+            entries.append((heat_no, i, d.get("name"), d.get("position"),
+                            str(kart) if kart is not None else None, d.get("best_lap_ms"),
+                            len(times) if times is not None else None, d.get("lap_times_url")))
+            for n, t in enumerate(times or [], start=1):
+                laps.append((heat_no, i, n, t, positions[n - 1] if n <= len(positions) else None))
+        row = (heat_no, doc.get("heat_type"), doc.get("start_time_iso"), doc.get("source_url"),
+               doc.get("skipped_reason"), doc.get("parser_version"), doc.get("source_sha256"),
+               json.dumps(doc, separators=(",", ":"), ensure_ascii=False))
+        with self._lock:
+            c = self._conn
+            c.execute("DELETE FROM laps WHERE heat_no = ?", (heat_no,))
+            c.execute("DELETE FROM driver_entries WHERE heat_no = ?", (heat_no,))
+            c.execute("INSERT OR REPLACE INTO heats VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+            c.executemany("INSERT INTO driver_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", entries)
+            c.executemany("INSERT INTO laps VALUES (?, ?, ?, ?, ?)", laps)
+            self._dirty += 1
+            if self._dirty >= self.batch_size:
+                c.commit()
+                self._dirty = 0
+
+    def read_heat(self, heat_no: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT doc FROM heats WHERE heat_no = ?", (heat_no,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def heat_nos(self) -> List[int]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT heat_no FROM heats ORDER BY heat_no")]
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._conn.commit()
+                self._dirty = 0
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+_dbs: Dict[int, HeatDB] = {}
+_dbs_lock = threading.Lock()
+
+def db() -> HeatDB:
+    """This process's HeatDB on config.SQLITE_FILE (worker processes open their own)."""
+    pid = os.getpid()
+    with _dbs_lock:
+        if pid not in _dbs:
+            _dbs[pid] = HeatDB(config.SQLITE_FILE, config.SQLITE_BATCH_SIZE)
+            atexit.register(_dbs[pid].flush)
+        return _dbs[pid]
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Import data/heats/*.json into the SQLite heats database")
+    p.add_argument("--db", default=config.SQLITE_FILE, help="database file to fill")
+    return p.parse_args()
+
+def main():
+    """One-shot importer: every JSON heat file, whatever STORAGE_BACKEND is set to."""
+    from . import storage
+    args = parse_args()
+    target = HeatDB(args.db, config.SQLITE_BATCH_SIZE)
+    started = time.monotonic()
+    heats = storage.list_json_heats()
+    for h in heats:
+        target.write_heat(h, storage.compact_heat(storage.read_heat_file(h)))
+    target.close()
+    print(f"Imported {len(heats)} heat(s) into {args.db} in {time.monotonic() - started:.1f}s.")
+
+if __name__ == "__main__":
+    main()
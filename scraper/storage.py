@@ -1,9 +1,93 @@
 from __future__ import annotations
 import json
 import os
-from typing import Dict, List, Any
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 from . import config
 
+try:
+    import orjson  # optional, several times faster than json for heat files
+except ImportError:
+    orjson = None
+
+def dumps(obj: Any) -> bytes:
+    """Serialize for data/: minified under STORAGE_COMPACT (orjson if installed), else indent=2."""
+    if not config.STORAGE_COMPACT:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return dumps_min(obj)
+
+def dumps_min(obj: Any) -> bytes:
+    """Minified, single-line JSON."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def read_json(path: str) -> Any:
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+def _to_ms(seconds):
+    return None if seconds is None else round(seconds * 1000)
+
+def _to_seconds(ms):
+    return None if ms is None else ms / 1000
+
+def compact_heat(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    On-disk form of a heat under STORAGE_COMPACT: each driver's "laps" and
+    "best_lap_seconds" become integer milliseconds ("laps_ms", "best_lap_ms").
+    """
+    drivers = doc.get("drivers")
+    if not drivers:
+        return doc
+    out = []
+    for d in drivers:
+        c = {}
+        for k, v in d.items():
+            if k == "laps":
+                c["laps_ms"] = [_to_ms(t) for t in v] if v is not None else None
+            elif k == "best_lap_seconds":
+                c["best_lap_ms"] = _to_ms(v)
+            else:
+                c[k] = v
+        out.append(c)
+    return {**doc, "drivers": out}
+
+def expand_heat(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of compact_heat(); documents already in seconds pass through unchanged."""
+    drivers = doc.get("drivers")
+    if not drivers or not any("laps_ms" in d or "best_lap_ms" in d for d in drivers):
+        return doc
+    out = []
+    for d in drivers:
+        e = {}
+        for k, v in d.items():
+            if k == "laps_ms":
+                e["laps"] = [_to_seconds(t) for t in v] if v is not None else None
+            elif k == "best_lap_ms":
+                e["best_lap_seconds"] = _to_seconds(v)
+            else:
+                e[k] = v
+        out.append(e)
+    return {**doc, "drivers": out}
+
+# where and how a heat document was produced, as opposed to what the heat says
+STAMP_FIELDS = ("source_url", "parser_version", "source_sha256")
+
+def same_heat(a: Dict[str, Any] | None, b: Dict[str, Any] | None, stamps: bool = True) -> bool:
+    """
+    Equal once written: lap times are compared at the millisecond precision they are
+    stored at. With stamps=False only the content counts (STAMP_FIELDS are ignored).
+    """
+    if a is None or b is None:
+        return a is b
+    if not stamps:
+        a = {k: v for k, v in a.items() if k not in STAMP_FIELDS}
+        b = {k: v for k, v in b.items() if k not in STAMP_FIELDS}
+    return compact_heat(a) == compact_heat(b)
+
 def ensure_dirs():
     os.makedirs(config.DATA_DIR, exist_ok=True)
     os.makedirs(config.HEATS_DIR, exist_ok=True)
@@ -21,14 +105,92 @@ def write_last_heat(heat_no: int):
     with open(config.LAST_HEAT_FILE, "w", encoding="utf-8") as f:
         f.write(str(heat_no))
 
+def read_frontier() -> int | None:
+    if not os.path.exists(config.FRONTIER_FILE):
+        return None
+    try:
+        val = read_json(config.FRONTIER_FILE).get("frontier_heat_no")
+        return val if isinstance(val, int) else None
+    except Exception:
+        return None
+
+def write_frontier(heat_no: int):
+    from datetime import datetime, timezone
+    write_json(config.FRONTIER_FILE, {
+        "frontier_heat_no": heat_no,
+        "updated_utc": datetime.now(timezone.utc).isoformat(),
+    })
+
 def heat_path(heat_no: int) -> str:
+    """File of a heat under the "json" backend only; use locate_heat() to find any backend's record."""
     return f"{config.HEATS_DIR}/{heat_no}.json"
 
+def _backend():
+    """The database or log behind the storage API; None for one JSON file per heat."""
+    if config.STORAGE_BACKEND == "sqlite":
+        from . import sqlite_store
+        return sqlite_store.db()
+    if config.STORAGE_BACKEND == "segments":
+        from . import segments
+        return segments.log()
+    return None
+
 def write_heat(heat_no: int, payload: Dict[str, Any]):
-    with open(heat_path(heat_no), "w", encoding="utf-8") as f:
-        json.dump(payload, f, indent=2, ensure_ascii=False)
+    backend = _backend()
+    if backend is not None:
+        backend.write_heat(heat_no, compact_heat(payload))
+        return
+    if config.STORAGE_COMPACT:
+        payload = compact_heat(payload)
+    with open(heat_path(heat_no), "wb") as f:
+        f.write(dumps(payload))
+
+def read_heat(heat_no: int) -> Dict[str, Any] | None:
+    """A stored heat in the in-memory form (lap times in seconds), whichever format it was written in."""
+    backend = _backend()
+    if backend is not None:
+        doc = backend.read_heat(heat_no)
+        return expand_heat(doc) if doc is not None else None
+    return read_heat_file(heat_no)
+
+def locate_heat(heat_no: int) -> Tuple[str, int, int] | None:
+    """(file, byte offset, length) holding a heat's stored record; None if absent or in SQLite."""
+    if config.STORAGE_BACKEND == "segments":
+        return _backend().locate(heat_no)
+    if config.STORAGE_BACKEND == "sqlite":
+        return None
+    path = heat_path(heat_no)
+    return (path, 0, os.path.getsize(path)) if os.path.exists(path) else None
+
+def iter_heats(heat_nos: Iterable[int] | None = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    (heat_no, heat) for the given stored heats (all of them by default), in no
+    particular order. The segment log serves this with sequential reads.
+    """
+    backend = _backend()
+    if hasattr(backend, "scan"):
+        for heat_no, doc in backend.scan(heat_nos):
+            yield heat_no, expand_heat(doc)
+        return
+    for heat_no in (heat_nos if heat_nos is not None else list_heat_files()):
+        doc = read_heat(heat_no)
+        if doc is not None:
+            yield heat_no, doc
+
+def read_heat_file(heat_no: int) -> Dict[str, Any] | None:
+    path = heat_path(heat_no)
+    if not os.path.exists(path):
+        return None
+    return expand_heat(read_json(path))
 
 def list_heat_files() -> List[int]:
+    """Numbers of all stored heats, ascending (from the database or log index under those backends)."""
+    backend = _backend()
+    if backend is not None:
+        return backend.heat_nos()
+    return list_json_heats()
+
+def list_json_heats() -> List[int]:
     if not os.path.isdir(config.HEATS_DIR):
         return []
     heats = []
@@ -37,16 +199,21 @@ def list_heat_files() -> List[int]:
             heats.append(int(name[:-5]))
     return sorted(heats)
 
+def flush():
+    """Commit writes still batched by the sqlite or segments backend (no-op for JSON files)."""
+    backend = _backend()
+    if backend is not None:
+        backend.flush()
+
 def write_json(path: str, obj: Any):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2, ensure_ascii=False)
+    with open(path, "wb") as f:
+        f.write(dumps(obj))
 
 def read_watchlist() -> List[str]:
     if not os.path.exists(config.WATCHLIST_FILE):
         return []
     try:
-        with open(config.WATCHLIST_FILE, "r", encoding="utf-8") as f:
-            names = json.load(f)
+        names = read_json(config.WATCHLIST_FILE)
         return [str(x).strip() for x in names if str(x).strip()]
     except Exception:
         return []
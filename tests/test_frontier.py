@@ -0,0 +1,22 @@
+from scraper import config
+from scraper.frontier import FrontierSearch
+
+def _search(existing):
+    return FrontierSearch(lambda h: {"heat_no": h} if h in existing else None)
+
+def test_crosses_gap_ending_between_probe_offsets():
+    # missing 77545-77579: 77580 lies between the old power-of-two offsets (+32, +64)
+    existing = set(range(77500, 77545)) | set(range(77580, 77601))
+    assert _search(existing).find(77500) == 77600
+
+def test_stops_when_nothing_within_max_gap():
+    existing = set(range(77500, 77545)) | {77545 + config.FRONTIER_MAX_GAP + 10}
+    assert _search(existing).find(77500) == 77544
+
+def test_probed_heats_are_reused_by_scrape():
+    existing = set(range(100, 120))
+    search = _search(existing)
+    assert search.find(100) == 119
+    probes = search.probes
+    assert search.scrape(119) == {"heat_no": 119}
+    assert search.probes == probes